@@ -0,0 +1,170 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import array
+import typing
+from Netlist import Primitive
+from Simulator import MODELS
+from Verifier import REFERENCE_MODELS
+
+WORD_MASK = 0xFFFF
+ROM_SIZE = 32768
+
+
+class CombinationalModel:
+    """
+    A built-in chip without state, computed by its function in
+    REFERENCE_MODELS.
+    """
+
+    def __init__(self, primitive: Primitive) -> None:
+        """
+        Args:
+            primitive (Primitive): the instance of the chip.
+        """
+        self.primitive = primitive
+        self.function = REFERENCE_MODELS[primitive.chip]
+        self.input_names = list(primitive.inputs)
+        self.output_names = list(primitive.outputs)
+
+    def read(self, *inputs: int) -> typing.Tuple[int, ...]:
+        outputs = self.function(**dict(zip(self.input_names, inputs)))
+        return tuple(outputs[name] for name in self.output_names)
+
+    def tick(self, *inputs: int) -> None:
+        pass
+
+    def tock(self) -> None:
+        pass
+
+
+class RegisterModel:
+    """
+    Bit, Register, ARegister and DRegister. Like in the hardware simulator,
+    value is loaded on tick, and shows on out on tock.
+    """
+
+    def __init__(self, primitive: Primitive) -> None:
+        """
+        Args:
+            primitive (Primitive): the instance of the chip.
+        """
+        self.primitive = primitive
+        self.value = 0
+        self.out = 0
+
+    def read(self) -> typing.Tuple[int]:
+        return self.out,
+
+    def tick(self, value: int, load: int) -> None:
+        if load:
+            self.value = value
+
+    def tock(self) -> None:
+        self.out = self.value
+
+
+class CounterModel(RegisterModel):
+    """The PC: a register that can also be reset and incremented."""
+
+    def tick(self, value: int, load: int, inc: int, reset: int) -> None:
+        if reset:
+            self.value = 0
+        elif load:
+            self.value = value
+        elif inc:
+            self.value = (self.value + 1) & WORD_MASK
+
+
+class MemoryModel:
+    """
+    RAM8 to RAM16K and the Screen: out is the word at address, and in is
+    written there on tick when load is set.
+    """
+
+    def __init__(self, primitive: Primitive) -> None:
+        """
+        Args:
+            primitive (Primitive): the instance of the chip.
+        """
+        self.primitive = primitive
+        self.memory = array.array(
+            'H', bytes(2 << len(primitive.inputs["address"])))
+
+    def read(self, address: int) -> typing.Tuple[int]:
+        return self.memory[address],
+
+    def tick(self, value: int, load: int, address: int) -> None:
+        if load:
+            self.memory[address] = value
+
+    def tock(self) -> None:
+        pass
+
+
+class KeyboardModel:
+    """The Keyboard: out is the code of the key that is pressed, if any."""
+
+    def __init__(self, primitive: Primitive) -> None:
+        """
+        Args:
+            primitive (Primitive): the instance of the chip.
+        """
+        self.primitive = primitive
+        self.value = 0
+
+    def read(self) -> typing.Tuple[int]:
+        return self.value,
+
+    def tick(self) -> None:
+        pass
+
+    def tock(self) -> None:
+        pass
+
+
+class ROMModel:
+    """ROM32K: out is the instruction at address."""
+
+    def __init__(self, primitive: Primitive) -> None:
+        """
+        Args:
+            primitive (Primitive): the instance of the chip.
+        """
+        self.primitive = primitive
+        self.memory = array.array('H', bytes(2 * ROM_SIZE))
+
+    def load(self, words: typing.List[int]) -> None:
+        """
+        Args:
+            words (typing.List[int]): the program, which replaces the
+                contents of the ROM.
+        """
+        if len(words) > ROM_SIZE:
+            raise Exception("program of %d words does not fit in the ROM"
+                            % len(words))
+        self.memory = array.array('H', words)
+        self.memory.frombytes(bytes(2 * (ROM_SIZE - len(words))))
+
+    def read(self, address: int) -> typing.Tuple[int]:
+        return self.memory[address],
+
+    def tick(self, address: int) -> None:
+        pass
+
+    def tock(self) -> None:
+        pass
+
+
+MODELS.update({name: CombinationalModel for name in REFERENCE_MODELS
+               if name != "Nand"})
+MODELS.update({name: RegisterModel for name in
+               ("Bit", "Register", "ARegister", "DRegister")})
+MODELS.update({name: MemoryModel for name in
+               ("RAM8", "RAM64", "RAM512", "RAM4K", "RAM16K", "Screen")})
+MODELS.update({"PC": CounterModel, "Keyboard": KeyboardModel,
+               "ROM32K": ROMModel})
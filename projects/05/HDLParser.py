@@ -0,0 +1,312 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import hashlib
+import os
+import re
+import typing
+
+HDL_EXTENSION = ".hdl"
+PROJECTS_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__)))
+# The directories of the chips built in projects 01-05, searched in order.
+CHIP_DIRECTORIES = [os.path.join(PROJECTS_DIRECTORY, *directory.split("/"))
+                    for directory in ("01", "02", "03/a", "03/b", "05")]
+BUILTIN_DIRECTORY = os.path.join(os.path.dirname(PROJECTS_DIRECTORY),
+                                 "tools", "builtInChips")
+CONSTANTS = ("false", "true")
+
+_tokens = re.compile(r"//[^\n]*|/\*.*?\*/|\.\.|\w+|\S", re.DOTALL)
+
+# Parsed chips, by the sha256 of their HDL.
+_parsed_chips = {}
+
+
+class Connection:
+    """
+    A pin of a part connected to a signal of the chip, as in
+    pin[low..high]=signal[low..high]. Bits are None when the whole pin or
+    signal is meant.
+    """
+
+    def __init__(self, pin: str, pin_bits: typing.Optional[typing.Tuple],
+                 signal: str, signal_bits: typing.Optional[typing.Tuple]) \
+            -> None:
+        """
+        Args:
+            pin (str): the pin of the part.
+            pin_bits (typing.Optional[typing.Tuple]): (low, high) bits of
+                the pin, or None.
+            signal (str): the signal of the chip, true or false.
+            signal_bits (typing.Optional[typing.Tuple]): (low, high) bits of
+                the signal, or None.
+        """
+        self.pin = pin
+        self.pin_bits = pin_bits
+        self.signal = signal
+        self.signal_bits = signal_bits
+
+
+class Part:
+    """A chip used as a part of another chip."""
+
+    def __init__(self, chip: str, connections: typing.List[Connection]) \
+            -> None:
+        """
+        Args:
+            chip (str): the name of the chip.
+            connections (typing.List[Connection]): its connections.
+        """
+        self.chip = chip
+        self.connections = connections
+
+
+class ChipDefinition:
+    """
+    A parsed .hdl file: the pins of a chip, and either its parts or the name
+    of the built-in implementation and its clocked pins.
+    """
+
+    def __init__(self, name: str, inputs: typing.Dict[str, int],
+                 outputs: typing.Dict[str, int], parts: typing.List[Part],
+                 builtin: typing.Optional[str] = None,
+                 clocked: typing.Optional[typing.List[str]] = None) -> None:
+        """
+        Args:
+            name (str): the name of the chip.
+            inputs (typing.Dict[str, int]): the width of every input pin.
+            outputs (typing.Dict[str, int]): the width of every output pin.
+            parts (typing.List[Part]): the parts of the chip.
+            builtin (typing.Optional[str]): the name of the built-in
+                implementation, for BUILTIN chips.
+            clocked (typing.Optional[typing.List[str]]): the CLOCKED pins.
+        """
+        self.name = name
+        self.inputs = inputs
+        self.outputs = outputs
+        self.parts = parts
+        self.builtin = builtin
+        self.clocked = clocked or []
+
+
+class HDLParser:
+    """
+    Parses the text of an .hdl file into a ChipDefinition.
+    """
+
+    def __init__(self, text: str) -> None:
+        """
+        Args:
+            text (str): the HDL.
+        """
+        self.tokens = [token for token in _tokens.findall(text)
+                       if not token.startswith("//") and
+                       not token.startswith("/*")]
+        self.position = 0
+
+    def peek(self) -> str:
+        """
+        Returns:
+            str: the next token, or "" at the end.
+        """
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+        return ""
+
+    def advance(self) -> str:
+        """
+        Returns:
+            str: the next token, which is consumed.
+        """
+        token = self.peek()
+        if not token:
+            raise Exception("unexpected end of HDL")
+        self.position += 1
+        return token
+
+    def expect(self, expected: str) -> None:
+        """
+        Args:
+            expected (str): the token that must come next.
+        """
+        token = self.advance()
+        if token != expected:
+            raise Exception("expected %r, got %r" % (expected, token))
+
+    def number(self) -> int:
+        """
+        Returns:
+            int: the next token, which must be a number.
+        """
+        token = self.advance()
+        if not token.isdigit():
+            raise Exception("expected a number, got %r" % token)
+        return int(token)
+
+    def bits(self) -> typing.Optional[typing.Tuple[int, int]]:
+        """
+        Returns:
+            typing.Optional[typing.Tuple[int, int]]: the (low, high) bits of
+            an optional [i] or [low..high] subscript.
+        """
+        if self.peek() != "[":
+            return None
+        self.advance()
+        low = high = self.number()
+        if self.peek() == "..":
+            self.advance()
+            high = self.number()
+        self.expect("]")
+        return low, high
+
+    def pins(self) -> typing.Dict[str, int]:
+        """
+        Returns:
+            typing.Dict[str, int]: the widths of the pins declared up to the
+            next ;.
+        """
+        pins = {}
+        while True:
+            name = self.advance()
+            pins[name] = 1
+            if self.peek() == "[":
+                self.advance()
+                pins[name] = self.number()
+                self.expect("]")
+            if self.advance() == ";":
+                return pins
+
+    def parse(self) -> ChipDefinition:
+        """
+        Returns:
+            ChipDefinition: the chip.
+        """
+        self.expect("CHIP")
+        name = self.advance()
+        self.expect("{")
+        inputs = {}
+        outputs = {}
+        parts = []
+        builtin = None
+        clocked = []
+        while self.peek() != "}":
+            section = self.advance()
+            if section == "IN":
+                inputs.update(self.pins())
+            elif section == "OUT":
+                outputs.update(self.pins())
+            elif section == "BUILTIN":
+                builtin = self.advance()
+                self.expect(";")
+            elif section == "CLOCKED":
+                clocked = list(self.pins())
+            elif section == "PARTS":
+                self.expect(":")
+                while self.peek() not in ("}", ""):
+                    parts.append(self.part())
+            else:
+                raise Exception("unexpected %r in chip %s" % (section, name))
+        self.expect("}")
+        return ChipDefinition(name, inputs, outputs, parts, builtin, clocked)
+
+    def part(self) -> Part:
+        """
+        Returns:
+            Part: the next part, like Nand(a=x, b=y, out=z);.
+        """
+        chip = self.advance()
+        self.expect("(")
+        connections = []
+        while True:
+            pin = self.advance()
+            pin_bits = self.bits()
+            self.expect("=")
+            signal = self.advance()
+            signal_bits = self.bits()
+            connections.append(Connection(pin, pin_bits, signal, signal_bits))
+            if self.advance() == ")":
+                break
+        self.expect(";")
+        return Part(chip, connections)
+
+
+def parse_hdl(text: str) -> ChipDefinition:
+    """Parses HDL, or returns the chip parsed earlier from the same text.
+
+    Args:
+        text (str): the HDL.
+
+    Returns:
+        ChipDefinition: the chip.
+    """
+    digest = hashlib.sha256(text.encode()).hexdigest()
+    definition = _parsed_chips.get(digest)
+    if definition is None:
+        definition = HDLParser(text).parse()
+        _parsed_chips[digest] = definition
+    return definition
+
+
+class ChipLibrary:
+    """
+    Finds chips by name: first in the chip directories, in order, and then
+    among the built-in chips. Chips named in native always come from the
+    built-in chips, even if they were built in HDL.
+    """
+
+    def __init__(self, directories: typing.Optional[typing.List[str]] = None,
+                 builtin_directory: str = BUILTIN_DIRECTORY,
+                 native: typing.Iterable[str] = ()) -> None:
+        """
+        Args:
+            directories (typing.Optional[typing.List[str]]): the directories
+                of HDL chips, CHIP_DIRECTORIES by default.
+            builtin_directory (str): the directory of the built-in chips.
+            native (typing.Iterable[str]): chips to take from the built-in
+                chips.
+        """
+        self.directories = CHIP_DIRECTORIES if directories is None \
+            else directories
+        self.builtin_directory = builtin_directory
+        self.native = set(native)
+        self.definitions = {}
+
+    def path(self, name: str) -> str:
+        """
+        Args:
+            name (str): the name of a chip.
+
+        Returns:
+            str: the path of its .hdl file.
+        """
+        directories = self.directories if name not in self.native else []
+        for directory in list(directories) + [self.builtin_directory]:
+            path = os.path.join(directory, name + HDL_EXTENSION)
+            if os.path.isfile(path):
+                return path
+        raise Exception("chip %s was not found" % name)
+
+    def get(self, name: str) -> ChipDefinition:
+        """Chips are read once per library, and parsed once per content.
+
+        Args:
+            name (str): the name of a chip.
+
+        Returns:
+            ChipDefinition: the parsed chip.
+        """
+        definition = self.definitions.get(name)
+        if definition is not None:
+            return definition
+        # Some of the chips have comments in cp1252, which latin-1 decodes.
+        with open(self.path(name), 'r', encoding="latin-1") as hdl_file:
+            definition = parse_hdl(hdl_file.read())
+        if definition.name != name:
+            raise Exception("%s%s defines chip %s" % (name, HDL_EXTENSION,
+                                                       definition.name))
+        self.definitions[name] = definition
+        return definition
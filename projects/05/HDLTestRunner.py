@@ -0,0 +1,383 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import argparse
+import concurrent.futures
+import os
+import sys
+import typing
+import BuiltinModels  # Registers the models of the built-in chips.
+from HDLParser import CHIP_DIRECTORIES, HDL_EXTENSION, ChipLibrary
+from Simulator import MODELS, CheckedModel, compile_chip
+from TestScript import SCRIPT_EXTENSION, WHILE_LIMIT, format_header, \
+    format_value, parse_column, parse_condition, parse_script, parse_value
+
+
+def matches(expected: str, line: str) -> bool:
+    """
+    Args:
+        expected (str): a line of a .cmp file, where * matches anything.
+        line (str): an output line.
+
+    Returns:
+        bool: True if the line is the expected one.
+    """
+    expected = expected.rstrip()
+    line = line.rstrip()
+    return len(expected) == len(line) and all(
+        wanted == "*" or wanted == actual
+        for wanted, actual in zip(expected, line))
+
+
+def read_hack(path: str) -> typing.List[int]:
+    """
+    Args:
+        path (str): path of a .hack file.
+
+    Returns:
+        typing.List[int]: its instructions.
+    """
+    with open(path, 'r') as hack_file:
+        return [int(line.strip(), 2) for line in hack_file if line.strip()]
+
+
+class HDLTestRunner:
+    """
+    Runs a .tst script that tests a chip on a CompiledChip. Like the hardware
+    simulator, the chips the tested chip is made of are taken from the
+    directory of the script, or else are built-in chips. Every output line
+    is compared to the .cmp file as soon as it is produced.
+
+    Chips can also be taken from all of the projects, which makes the
+    memory chips millions of gates; naming them native simulates them by
+    their models instead. Only chips with a model in MODELS can be native:
+    Memory and Computer become tractable by naming RAM16K native (Screen
+    and Keyboard are always built-in), not Memory itself. The Computer
+    scripts also read the state of the PC, so it must be native too.
+    """
+
+    def __init__(self, script_path: str, write_output: bool = True,
+                 project_chips: bool = False,
+                 native: typing.Iterable[str] = (),
+                 check_native: bool = False) -> None:
+        """
+        Args:
+            script_path (str): path of the .tst script.
+            write_output (bool): write the output file the script names.
+            project_chips (bool): take chips from the directories of all of
+                the projects too, after the directory of the script.
+            native (typing.Iterable[str]): chips to simulate by their models
+                even if they are built in HDL.
+            check_native (bool): check the models of the native chips
+                against their HDL implementations.
+        """
+        self.script_path = script_path
+        self.directory = os.path.dirname(os.path.abspath(script_path))
+        self.write_output = write_output
+        self.project_chips = project_chips
+        self.native = native
+        self.check_native = check_native
+        self.chip = None
+        self.time = 0
+        self.half_cycle = False
+        self.columns = []
+        self.output_file = None
+        self.compare_file = None
+        self.line_number = 0
+
+    def run(self) -> int:
+        """Runs the script. A mismatch with the .cmp file raises.
+
+        Returns:
+            int: the number of lines compared.
+        """
+        with open(self.script_path, 'r') as script_file:
+            commands = parse_script(script_file.read())
+        try:
+            self.execute(commands)
+        finally:
+            for file in (self.output_file, self.compare_file):
+                if file is not None:
+                    file.close()
+        return self.line_number
+
+    def execute(self, commands: typing.List[typing.Any]) -> None:
+        """
+        Args:
+            commands (typing.List[typing.Any]): parsed commands.
+        """
+        for command in commands:
+            if command[0] == "repeat" and command[1] is None:
+                raise Exception("unsupported block: endless repeat")
+            if command[0] == "repeat":
+                for _ in range(command[1]):
+                    self.execute(command[2])
+            elif command[0] == "while":
+                iterations = 0
+                while self.holds(command[1]):
+                    iterations += 1
+                    if iterations > WHILE_LIMIT:
+                        raise Exception(
+                            "while %s still holds after %d iterations; it "
+                            "may wait for a key press" % (command[1],
+                                                          WHILE_LIMIT))
+                    self.execute(command[2])
+            elif command[0] == "load":
+                self.load(command[1])
+            elif command[0] == "ROM32K" and command[1] == "load":
+                self.model("ROM32K").load(read_hack(
+                    os.path.join(self.directory, command[2])))
+            elif command[0] == "output-file":
+                if self.write_output:
+                    self.output_file = open(
+                        os.path.join(self.directory, command[1]), 'w')
+            elif command[0] == "compare-to":
+                self.compare_file = open(
+                    os.path.join(self.directory, command[1]), 'r')
+            elif command[0] == "output-list":
+                self.columns = [parse_column(spec) for spec in command[1:]]
+                self.emit(format_header(self.columns))
+            elif command[0] == "set":
+                self.set(command[1], parse_value(command[2]))
+            elif command[0] == "eval":
+                self.chip.evaluate()
+            elif command[0] == "tick":
+                self.chip.tick()
+                self.half_cycle = True
+            elif command[0] == "tock":
+                self.chip.tock()
+                self.half_cycle = False
+                self.time += 1
+            elif command[0] == "output":
+                self.emit("|" + "|".join(
+                    " " * left + format_value(self.get(name), output_format,
+                                              width) + " " * right
+                    for name, output_format, left, width, right
+                    in self.columns) + "|")
+            elif command[0] not in ("echo", "clear-echo"):
+                raise Exception("unsupported command: %s" % " ".join(command))
+
+    def holds(self, condition: str) -> bool:
+        """
+        Args:
+            condition (str): the condition of a while block, like out <> 75.
+
+        Returns:
+            bool: True if the condition holds now.
+        """
+        name, compare, value = parse_condition(condition)
+        return compare(self.get(name), value)
+
+    def load(self, name: str) -> None:
+        """
+        Args:
+            name (str): the .hdl file of the chip the script tests.
+        """
+        if not name.endswith(HDL_EXTENSION):
+            raise Exception("%s is not a chip" % name)
+        chip = name[:-len(HDL_EXTENSION)]
+        directories = [self.directory]
+        if self.project_chips:
+            directories.extend(directory for directory in CHIP_DIRECTORIES
+                               if directory != self.directory)
+        # The tested chip itself is always simulated from its HDL.
+        library = ChipLibrary(directories,
+                              native=set(self.native) - {chip})
+        self.chip = compile_chip(chip, library, self.check_native)
+
+    def model(self, chip: str) -> typing.Any:
+        """
+        Args:
+            chip (str): the name of a built-in chip.
+
+        Returns:
+            typing.Any: the model of its first instance in the tested chip.
+        """
+        for model in self.chip.models:
+            if model.primitive.chip == chip:
+                return model
+        if chip in MODELS:
+            raise Exception("%s has no built-in %s; simulate it by its model "
+                            "with --native %s" % (self.chip.netlist.name,
+                                                  chip, chip))
+        raise Exception("%s has no %s" % (self.chip.netlist.name, chip))
+
+    def get(self, name: str) -> typing.Any:
+        """
+        Args:
+            name (str): a pin, time, or the state of a built-in part, like
+                DRegister[] or RAM16K[5].
+
+        Returns:
+            typing.Any: its value; words are signed.
+        """
+        if name == "time":
+            return "%d%s" % (self.time, "+" if self.half_cycle else "")
+        if "[" in name:
+            chip, _, index = name[:-1].partition("[")
+            model = self.model(chip)
+            if hasattr(model, "memory"):
+                value = model.memory[int(index)]
+            else:
+                value = model.value
+            width = 16
+        else:
+            value = self.chip.get(name)
+            width = self.chip.masks[name].bit_length()
+        if width == 16 and value & 0x8000:
+            return value - 0x10000
+        return value
+
+    def set(self, name: str, value: int) -> None:
+        """
+        Args:
+            name (str): an input pin, or the state of a built-in part.
+            value (int): its new value.
+        """
+        if "[" not in name:
+            self.chip.set(name, value)
+            return
+        chip, _, index = name[:-1].partition("[")
+        model = self.model(chip)
+        if isinstance(model, CheckedModel):
+            # Its HDL cannot be set to match, so it is no longer checked.
+            position = self.chip.models.index(model)
+            model = self.chip.models[position] = model.model
+        if hasattr(model, "memory"):
+            model.memory[int(index)] = value & 0xFFFF
+        else:
+            model.value = model.out = value & 0xFFFF
+
+    def emit(self, line: str) -> None:
+        """Writes an output line, and compares it to the next .cmp line.
+
+        Args:
+            line (str): the output line.
+        """
+        if self.output_file is not None:
+            self.output_file.write(line + "\n")
+        if self.compare_file is None:
+            return
+        self.line_number += 1
+        expected = self.compare_file.readline()
+        if not matches(expected, line):
+            raise Exception("comparison failure at line %d: expected %r, "
+                            "got %r" % (self.line_number, expected.rstrip(),
+                                        line))
+
+
+def is_chip_script(script_path: str) -> bool:
+    """
+    Args:
+        script_path (str): path of a .tst script.
+
+    Returns:
+        bool: True if the script loads a chip, rather than a program or VM
+        code.
+    """
+    with open(script_path, 'r') as script_file:
+        for command in parse_script(script_file.read()):
+            if command[0] == "load" and len(command) > 1:
+                return command[1].endswith(HDL_EXTENSION)
+    return False
+
+
+def _run_script_job(arguments: typing.Dict[str, typing.Any]) \
+        -> typing.Tuple[int, typing.Optional[str]]:
+    """Runs a script in a worker process. Errors are returned instead of
+    raised, so the parent reports them with the rest of the results.
+
+    Args:
+        arguments (typing.Dict[str, typing.Any]): keyword arguments of
+            HDLTestRunner.
+
+    Returns:
+        typing.Tuple[int, typing.Optional[str]]: the number of lines compared
+        and None, or 0 and an error message.
+    """
+    try:
+        return HDLTestRunner(**arguments).run(), None
+    except Exception as error:
+        return 0, "%s: %s: %s" % (arguments["script_path"],
+                                  type(error).__name__, error)
+
+
+if "__main__" == __name__:
+    # Runs a .tst script, or every chip script under a directory.
+    argument_parser = argparse.ArgumentParser(prog="HDLTestRunner")
+    argument_parser.add_argument("input_path")
+    argument_parser.add_argument(
+        "--jobs", type=int, default=0, metavar="N",
+        help="run scripts in N processes (0 for one per CPU)")
+    argument_parser.add_argument(
+        "--no-output", dest="write_output", action="store_false",
+        help="do not write the output files the scripts name")
+    argument_parser.add_argument(
+        "--project-chips", action="store_true",
+        help="take parts from all of the projects, not the built-in chips")
+    argument_parser.add_argument(
+        "--native", action="append", default=[], metavar="CHIP",
+        help="simulate CHIP by its model even where it is built in HDL, "
+             "like RAM16K for Memory, and RAM16K and PC for Computer")
+    argument_parser.add_argument(
+        "--check-native", action="store_true",
+        help="check the native chips against their own HDL as the tests "
+             "run, with the parts of that HDL native too")
+    arguments = argument_parser.parse_args()
+    if arguments.jobs < 0:
+        argument_parser.error("--jobs must be 0 or more")
+    for chip in arguments.native:
+        if chip not in MODELS:
+            argument_parser.error("%s has no native model; models exist for "
+                                  "%s" % (chip, ", ".join(sorted(MODELS))))
+    argument_path = os.path.abspath(arguments.input_path)
+    if os.path.isdir(argument_path):
+        scripts = sorted(
+            os.path.join(root, filename)
+            for root, _, filenames in os.walk(argument_path)
+            for filename in filenames
+            if filename.endswith(SCRIPT_EXTENSION))
+        scripts = [script for script in scripts if is_chip_script(script)]
+    else:
+        scripts = [argument_path]
+    jobs = [dict(script_path=script, write_output=arguments.write_output,
+                 project_chips=arguments.project_chips,
+                 native=arguments.native,
+                 check_native=arguments.check_native)
+            for script in scripts]
+    failed = 0
+
+    def report(job: typing.Dict[str, typing.Any], lines: int,
+               error: typing.Optional[str]) -> None:
+        global failed
+        if error is not None:
+            print("FAIL %s" % error, file=sys.stderr, flush=True)
+            failed += 1
+        else:
+            print("PASS %s (%d lines)" % (job["script_path"], lines),
+                  flush=True)
+
+    # Results are printed as soon as they arrive, and a worker that dies
+    # (out of memory, say) only fails the scripts it took down with it.
+    if arguments.jobs == 1:
+        for job in jobs:
+            report(job, *_run_script_job(job))
+    else:
+        with concurrent.futures.ProcessPoolExecutor(
+                max_workers=arguments.jobs or None) as executor:
+            futures = {executor.submit(_run_script_job, job): job
+                       for job in jobs}
+            for future in concurrent.futures.as_completed(futures):
+                job = futures[future]
+                try:
+                    report(job, *future.result())
+                except concurrent.futures.process.BrokenProcessPool as error:
+                    report(job, 0, "%s: worker process died: %s" % (
+                        job["script_path"], error))
+    print("%d passed, %d failed" % (len(jobs) - failed, failed))
+    if failed:
+        sys.exit(1)
@@ -0,0 +1,288 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import argparse
+import typing
+from HDLParser import ChipDefinition, ChipLibrary, CONSTANTS
+
+# The nets every netlist starts with, which carry the constants.
+FALSE_NET = 0
+TRUE_NET = 1
+
+
+class Primitive:
+    """
+    An instance of a built-in chip in a flattened netlist. Its pins are
+    lists of nets, least significant bit first.
+    """
+
+    def __init__(self, chip: str, path: str,
+                 inputs: typing.Dict[str, typing.List[int]],
+                 outputs: typing.Dict[str, typing.List[int]],
+                 clocked: typing.Iterable[str] = ()) -> None:
+        """
+        Args:
+            chip (str): the name of the built-in implementation.
+            path (str): where the instance is in the chip hierarchy, like
+                Mux/Nand[1].
+            inputs (typing.Dict[str, typing.List[int]]): the nets of every
+                input pin.
+            outputs (typing.Dict[str, typing.List[int]]): the nets of every
+                output pin.
+            clocked (typing.Iterable[str]): the clocked input pins.
+        """
+        self.chip = chip
+        self.path = path
+        self.inputs = inputs
+        self.outputs = outputs
+        self.clocked = set(clocked)
+
+
+class Netlist:
+    """
+    A chip flattened down to built-in chips: every bit of every pin and
+    internal signal is a net, numbered from 0, where nets 0 and 1 are false
+    and true. Every other net is driven by an input of the chip or by an
+    output of one primitive, and undriven nets are joined with false.
+    """
+
+    def __init__(self, name: str, inputs: typing.Dict[str, typing.List[int]],
+                 outputs: typing.Dict[str, typing.List[int]],
+                 primitives: typing.List[Primitive], net_count: int) -> None:
+        """
+        Args:
+            name (str): the name of the chip.
+            inputs (typing.Dict[str, typing.List[int]]): the nets of every
+                input pin of the chip.
+            outputs (typing.Dict[str, typing.List[int]]): the nets of every
+                output pin of the chip.
+            primitives (typing.List[Primitive]): the built-in chips.
+            net_count (int): the number of nets.
+        """
+        self.name = name
+        self.inputs = inputs
+        self.outputs = outputs
+        self.primitives = primitives
+        self.net_count = net_count
+
+    def primitive_counts(self) -> typing.Dict[str, int]:
+        """
+        Returns:
+            typing.Dict[str, int]: the number of instances of every built-in
+            chip.
+        """
+        counts = {}
+        for primitive in self.primitives:
+            counts[primitive.chip] = counts.get(primitive.chip, 0) + 1
+        return counts
+
+
+def _bits(nets: typing.List[int],
+          bits: typing.Optional[typing.Tuple[int, int]], name: str) \
+        -> typing.List[int]:
+    """
+    Args:
+        nets (typing.List[int]): the nets of a pin or a signal.
+        bits (typing.Optional[typing.Tuple[int, int]]): (low, high) bits, or
+            None for all of them.
+        name (str): the name of the pin or signal, for errors.
+
+    Returns:
+        typing.List[int]: the nets of the bits.
+    """
+    if bits is None:
+        return nets
+    low, high = bits
+    if not 0 <= low <= high < len(nets):
+        raise Exception("%s[%d..%d] is out of range" % (name, low, high))
+    return nets[low:high + 1]
+
+
+class NetlistBuilder:
+    """
+    Flattens chips by instantiating their parts recursively. Connected bits
+    are joined in a union-find over nets, which are renumbered at the end.
+    """
+
+    def __init__(self, library: ChipLibrary) -> None:
+        """
+        Args:
+            library (ChipLibrary): where the parts are found.
+        """
+        self.library = library
+        self.parents = [FALSE_NET, TRUE_NET]
+        self.primitives = []
+
+    def new_nets(self, width: int) -> typing.List[int]:
+        """
+        Args:
+            width (int): the number of nets.
+
+        Returns:
+            typing.List[int]: new, unconnected nets.
+        """
+        first = len(self.parents)
+        self.parents.extend(range(first, first + width))
+        return list(range(first, first + width))
+
+    def find(self, net: int) -> int:
+        """
+        Args:
+            net (int): a net.
+
+        Returns:
+            int: the net that represents every net connected to it.
+        """
+        parents = self.parents
+        root = net
+        while parents[root] != root:
+            root = parents[root]
+        while parents[net] != root:
+            parents[net], net = root, parents[net]
+        return root
+
+    def join(self, first: int, second: int) -> None:
+        """
+        Args:
+            first (int): a net.
+            second (int): a net connected to it.
+        """
+        first = self.find(first)
+        second = self.find(second)
+        # The constants stay the representatives of their nets.
+        if first > second:
+            first, second = second, first
+        self.parents[second] = first
+
+    def instantiate(self, definition: ChipDefinition,
+                    ports: typing.Dict[str, typing.List[int]],
+                    path: str) -> None:
+        """Adds a chip to the netlist.
+
+        Args:
+            definition (ChipDefinition): the chip.
+            ports (typing.Dict[str, typing.List[int]]): the nets of its pins.
+            path (str): where it is in the chip hierarchy.
+        """
+        if definition.builtin is not None:
+            self.primitives.append(Primitive(
+                definition.builtin, path,
+                {pin: ports[pin] for pin in definition.inputs},
+                {pin: ports[pin] for pin in definition.outputs},
+                definition.clocked))
+            return
+        signals = dict(ports)
+        instances = {}
+        for part in definition.parts:
+            chip = self.library.get(part.chip)
+            widths = dict(chip.inputs)
+            widths.update(chip.outputs)
+            part_ports = {pin: self.new_nets(width)
+                          for pin, width in widths.items()}
+            for connection in part.connections:
+                if connection.pin not in part_ports:
+                    raise Exception("%s has no pin %s" % (part.chip,
+                                                          connection.pin))
+                pin_nets = _bits(part_ports[connection.pin],
+                                 connection.pin_bits, connection.pin)
+                signal = connection.signal
+                if signal in CONSTANTS:
+                    if connection.pin in chip.outputs:
+                        raise Exception("output %s of %s drives %s" % (
+                            connection.pin, part.chip, signal))
+                    signal_nets = [CONSTANTS.index(signal)] * len(pin_nets)
+                else:
+                    if signal not in signals:
+                        if connection.signal_bits is not None:
+                            raise Exception("sub-bus of internal signal %s"
+                                            % signal)
+                        signals[signal] = self.new_nets(len(pin_nets))
+                    signal_nets = _bits(signals[signal],
+                                        connection.signal_bits, signal)
+                if len(signal_nets) != len(pin_nets):
+                    raise Exception("%s.%s=%s: widths %d and %d differ" % (
+                        part.chip, connection.pin, signal, len(pin_nets),
+                        len(signal_nets)))
+                for pin_net, signal_net in zip(pin_nets, signal_nets):
+                    self.join(pin_net, signal_net)
+            index = instances.get(part.chip, 0)
+            instances[part.chip] = index + 1
+            self.instantiate(chip, part_ports, "%s/%s[%d]" % (
+                path, part.chip, index))
+
+    def build(self, name: str) -> Netlist:
+        """
+        Args:
+            name (str): the name of the chip to flatten.
+
+        Returns:
+            Netlist: the flattened chip.
+        """
+        definition = self.library.get(name)
+        inputs = {pin: self.new_nets(width)
+                  for pin, width in definition.inputs.items()}
+        outputs = {pin: self.new_nets(width)
+                   for pin, width in definition.outputs.items()}
+        ports = dict(inputs)
+        ports.update(outputs)
+        self.instantiate(definition, ports, name)
+        # Gives every group of connected nets one number, checking that it
+        # is driven at most once.
+        numbers = {FALSE_NET: FALSE_NET, TRUE_NET: TRUE_NET}
+        driven = set(numbers)
+        drivers = [nets for nets in inputs.values()]
+        drivers.extend(nets for primitive in self.primitives
+                       for nets in primitive.outputs.values())
+        for nets in drivers:
+            for net in nets:
+                root = self.find(net)
+                if root in driven:
+                    raise Exception("%s: a net has several drivers" % name)
+                driven.add(root)
+                numbers[root] = len(numbers)
+
+        def renumber(nets: typing.List[int]) -> typing.List[int]:
+            return [numbers.get(self.find(net), FALSE_NET) for net in nets]
+        for primitive in self.primitives:
+            primitive.inputs = {pin: renumber(nets)
+                                for pin, nets in primitive.inputs.items()}
+            primitive.outputs = {pin: renumber(nets)
+                                 for pin, nets in primitive.outputs.items()}
+        return Netlist(
+            name, {pin: renumber(nets) for pin, nets in inputs.items()},
+            {pin: renumber(nets) for pin, nets in outputs.items()},
+            self.primitives, len(numbers))
+
+
+def build_netlist(name: str, library: typing.Optional[ChipLibrary] = None) \
+        -> Netlist:
+    """
+    Args:
+        name (str): the name of a chip.
+        library (typing.Optional[ChipLibrary]): where chips are found, the
+            default ChipLibrary if None.
+
+    Returns:
+        Netlist: the chip, flattened down to built-in chips.
+    """
+    return NetlistBuilder(library or ChipLibrary()).build(name)
+
+
+if "__main__" == __name__:
+    # Flattens a chip and prints the built-in chips it is made of.
+    argument_parser = argparse.ArgumentParser(prog="Netlist")
+    argument_parser.add_argument("chip")
+    argument_parser.add_argument(
+        "--native", action="append", default=[], metavar="CHIP",
+        help="use the built-in implementation of CHIP")
+    arguments = argument_parser.parse_args()
+    netlist = build_netlist(arguments.chip,
+                            ChipLibrary(native=arguments.native))
+    print("%s: %d nets, %d primitives" % (
+        netlist.name, netlist.net_count, len(netlist.primitives)))
+    for chip, count in sorted(netlist.primitive_counts().items()):
+        print("%8d %s" % (count, chip))
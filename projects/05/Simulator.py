@@ -0,0 +1,401 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import argparse
+import random
+import time
+import typing
+from HDLParser import ChipLibrary
+from Netlist import FALSE_NET, TRUE_NET, Netlist, Primitive, build_netlist
+
+# Models of built-in chips other than Nand and DFF, by chip name. A model is
+# created with the Primitive it simulates. read(*inputs) returns the values
+# of its outputs from the values of its unclocked inputs, tick(*inputs)
+# samples all of its inputs, and tock() commits what was sampled.
+# BuiltinModels adds the models of all of the built-in chips.
+MODELS = {}
+
+
+def levelize(netlist: Netlist) -> typing.List[Primitive]:
+    """Sorts the primitives so that each one comes after the primitives that
+    drive its inputs. DFFs are left out: their outputs are known from the
+    state before anything is evaluated, and their inputs are only sampled.
+    The clocked inputs of models are sampled too, so they are not
+    dependencies either.
+
+    Args:
+        netlist (Netlist): a netlist.
+
+    Returns:
+        typing.List[Primitive]: the primitives that are not DFFs, in
+        evaluation order.
+    """
+    primitives = [primitive for primitive in netlist.primitives
+                  if primitive.chip != "DFF"]
+    drivers = {}
+    for index, primitive in enumerate(primitives):
+        for nets in primitive.outputs.values():
+            for net in nets:
+                drivers[net] = index
+    dependents = [[] for _ in primitives]
+    pending = [0] * len(primitives)
+    for index, primitive in enumerate(primitives):
+        sources = {drivers[net] for pin, nets in primitive.inputs.items()
+                   if pin not in primitive.clocked
+                   for net in nets if net in drivers}
+        pending[index] = len(sources)
+        for source in sources:
+            dependents[source].append(index)
+    ready = [index for index, count in enumerate(pending) if not count]
+    order = []
+    while ready:
+        index = ready.pop()
+        order.append(primitives[index])
+        for dependent in dependents[index]:
+            pending[dependent] -= 1
+            if not pending[dependent]:
+                ready.append(dependent)
+    if len(order) != len(primitives):
+        raise Exception("%s has a combinational loop" % netlist.name)
+    return order
+
+
+def _pack(values: typing.List[str]) -> str:
+    """
+    Args:
+        values (typing.List[str]): expressions of bits, least significant
+            first.
+
+    Returns:
+        str: an expression of the bus they make.
+    """
+    terms = [value if bit == 0 else "%s << %d" % (value, bit)
+             for bit, value in enumerate(values) if value != "0"]
+    return " | ".join(terms) or "0"
+
+
+def generate_source(netlist: Netlist, sliced: bool = False) -> str:
+    """Generates a straight-line Python function that evaluates a netlist:
+    evaluate(inputs, state, models) returns the values of the outputs, the
+    values the DFFs would sample, and the inputs of every model.
+
+    Buses are ints, and every net is a local that holds one bit of them.
+    When sliced, every input bit is given as an int of its own, whose bits
+    are independent vectors, and mask has a 1 for every vector: a Nand is
+    mask ^ (a & b), so one evaluation computes all of the vectors.
+
+    Constants are folded, double negations are removed, and only the nets
+    that reach an output, a DFF or a model are computed.
+
+    Args:
+        netlist (Netlist): a netlist.
+        sliced (bool): generate the bit-sliced variant, which supports
+            neither DFFs nor models.
+
+    Returns:
+        str: the source of the function.
+    """
+    order = levelize(netlist)
+    dffs = [primitive for primitive in netlist.primitives
+            if primitive.chip == "DFF"]
+    models = [primitive for primitive in order if primitive.chip != "Nand"]
+    if sliced and (dffs or models):
+        raise Exception("%s is not combinational" % netlist.name)
+    ones = "mask" if sliced else "1"
+    # Finds the nets that are needed, walking back from the sinks.
+    drivers = {}
+    for primitive in order:
+        for nets in primitive.outputs.values():
+            for net in nets:
+                drivers[net] = primitive
+    needed = set()
+    stack = [net for nets in netlist.outputs.values() for net in nets]
+    stack.extend(dff.inputs["in"][0] for dff in dffs)
+    stack.extend(net for model in models for nets in model.inputs.values()
+                 for net in nets)
+    while stack:
+        net = stack.pop()
+        if net in needed:
+            continue
+        needed.add(net)
+        primitive = drivers.get(net)
+        if primitive is not None:
+            stack.extend(net for pin, nets in primitive.inputs.items()
+                         if pin not in primitive.clocked for net in nets)
+    values = {FALSE_NET: "0", TRUE_NET: ones}
+    negations = {}
+    lines = ["def evaluate(inputs, state, models%s):" % (
+        ", mask" if sliced else "")]
+    for index, nets in enumerate(netlist.inputs.values()):
+        for bit, net in enumerate(nets):
+            if net in needed and net not in values:
+                values[net] = "n%d" % net
+                source = "inputs[%d][%d]" % (index, bit) if sliced else \
+                    "inputs[%d] >> %d & 1" % (index, bit)
+                lines.append("    n%d = %s" % (net, source))
+    for index, dff in enumerate(dffs):
+        net = dff.outputs["out"][0]
+        values[net] = "n%d" % net
+        lines.append("    n%d = state[%d]" % (net, index))
+    for primitive in order:
+        if primitive.chip != "Nand":
+            index = models.index(primitive)
+            arguments = ", ".join(
+                _pack([values.get(net, "0") for net in nets])
+                for pin, nets in primitive.inputs.items()
+                if pin not in primitive.clocked)
+            names = []
+            for pin, nets in primitive.outputs.items():
+                names.append("t%d_%s" % (index, pin))
+                for bit, net in enumerate(nets):
+                    if net in needed:
+                        values[net] = "n%d" % net
+            lines.append("    %s, = models[%d].read(%s)" % (
+                ", ".join(names), index, arguments))
+            for pin, nets in primitive.outputs.items():
+                for bit, net in enumerate(nets):
+                    if net in needed:
+                        lines.append("    n%d = t%d_%s >> %d & 1" % (
+                            net, index, pin, bit))
+            continue
+        net = primitive.outputs["out"][0]
+        if net not in needed:
+            continue
+        a = values.get(primitive.inputs["a"][0], "0")
+        b = values.get(primitive.inputs["b"][0], "0")
+        if a == "0" or b == "0":
+            values[net] = ones
+            continue
+        if a == ones:
+            a = b
+        elif b != ones and a != b:
+            values[net] = "n%d" % net
+            lines.append("    n%d = %s ^ (%s & %s)" % (net, ones, a, b))
+            continue
+        # A negation of a.
+        if a in negations:
+            values[net] = negations[a]
+            continue
+        values[net] = "n%d" % net
+        negations["n%d" % net] = a
+        lines.append("    n%d = %s ^ %s" % (net, ones, a))
+    if sliced:
+        outputs = ["[%s]" % ", ".join(values.get(net, "0") for net in nets)
+                   for nets in netlist.outputs.values()]
+    else:
+        outputs = [_pack([values.get(net, "0") for net in nets])
+                   for nets in netlist.outputs.values()]
+    samples = [values.get(dff.inputs["in"][0], "0") for dff in dffs]
+    model_inputs = ["(%s)" % "".join(
+        _pack([values.get(net, "0") for net in nets]) + ", "
+        for nets in model.inputs.values()) for model in models]
+    lines.append("    return [%s], [%s], [%s]" % (
+        ", ".join(outputs), ", ".join(samples), ", ".join(model_inputs)))
+    return "\n".join(lines) + "\n"
+
+
+class CheckedModel:
+    """
+    Runs a model next to a simulation of the HDL chip it replaces, and
+    raises as soon as their outputs differ.
+    """
+
+    def __init__(self, model: typing.Any, primitive: Primitive,
+                 reference: "CompiledChip") -> None:
+        """
+        Args:
+            model (typing.Any): the model.
+            primitive (Primitive): the instance it simulates.
+            reference (CompiledChip): the HDL implementation of the chip.
+        """
+        self.model = model
+        self.primitive = primitive
+        self.reference = reference
+        self.unclocked = [pin for pin in primitive.inputs
+                          if pin not in primitive.clocked]
+
+    def __getattr__(self, name: str) -> typing.Any:
+        return getattr(self.model, name)
+
+    def read(self, *inputs: int) -> typing.Tuple[int, ...]:
+        outputs = self.model.read(*inputs)
+        for pin, value in zip(self.unclocked, inputs):
+            self.reference.set(pin, value)
+        self.reference.evaluate()
+        self.compare(outputs)
+        return outputs
+
+    def tick(self, *inputs: int) -> None:
+        self.model.tick(*inputs)
+        for pin, value in zip(self.primitive.inputs, inputs):
+            self.reference.set(pin, value)
+        self.reference.tick()
+
+    def tock(self) -> None:
+        self.model.tock()
+        self.reference.tock()
+
+    def compare(self, outputs: typing.Tuple[int, ...]) -> None:
+        """
+        Args:
+            outputs (typing.Tuple[int, ...]): the outputs of the model.
+        """
+        for pin, value in zip(self.primitive.outputs, outputs):
+            expected = self.reference.get(pin)
+            if value != expected:
+                inputs = ", ".join("%s=%d" % (name, self.reference.get(name))
+                                   for name in self.reference.input_names)
+                raise Exception("native %s differs from its HDL: %s is %d "
+                                "instead of %d for %s" % (
+                                    self.primitive.path, pin, value,
+                                    expected, inputs))
+
+
+class CompiledChip:
+    """
+    Simulates a chip by running the function generate_source generates for
+    its netlist. Input pins are set as ints, outputs are evaluated all at
+    once, and clocked chips advance with tick and tock like in the
+    hardware simulator.
+    """
+
+    def __init__(self, netlist: Netlist,
+                 checks: typing.Optional[typing.Dict[str, Netlist]] = None) \
+            -> None:
+        """
+        Args:
+            netlist (Netlist): the chip.
+            checks (typing.Optional[typing.Dict[str, Netlist]]): netlists of
+                the HDL implementations of built-in chips, by name. Every
+                instance of these chips is checked against its netlist.
+        """
+        self.netlist = netlist
+        self.source = generate_source(netlist)
+        namespace = {}
+        exec(compile(self.source, "<chip %s>" % netlist.name, "exec"),
+             namespace)
+        self.function = namespace["evaluate"]
+        self.input_names = list(netlist.inputs)
+        self.output_names = list(netlist.outputs)
+        self.masks = {name: (1 << len(nets)) - 1 for name, nets in
+                      list(netlist.inputs.items()) +
+                      list(netlist.outputs.items())}
+        self.inputs = [0] * len(self.input_names)
+        dffs = [primitive for primitive in netlist.primitives
+                if primitive.chip == "DFF"]
+        self.state = [0] * len(dffs)
+        self.models = []
+        for primitive in levelize(netlist):
+            if primitive.chip != "Nand":
+                if primitive.chip not in MODELS:
+                    raise Exception("built-in chip %s cannot be simulated"
+                                    % primitive.chip)
+                model = MODELS[primitive.chip](primitive)
+                if checks and primitive.chip in checks:
+                    model = CheckedModel(model, primitive,
+                                         CompiledChip(checks[primitive.chip]))
+                self.models.append(model)
+        self.outputs = []
+        self.samples = []
+        self.model_inputs = []
+        self.evaluate()
+
+    def set(self, name: str, value: int) -> None:
+        """
+        Args:
+            name (str): an input pin.
+            value (int): its new value, truncated to the width of the pin.
+        """
+        self.inputs[self.input_names.index(name)] = value & self.masks[name]
+
+    def get(self, name: str) -> int:
+        """
+        Args:
+            name (str): an input or output pin.
+
+        Returns:
+            int: its value, as an unsigned int.
+        """
+        if name in self.output_names:
+            return self.outputs[self.output_names.index(name)]
+        return self.inputs[self.input_names.index(name)]
+
+    def evaluate(self) -> None:
+        """Computes the outputs from the inputs and the state."""
+        self.outputs, self.samples, self.model_inputs = self.function(
+            self.inputs, self.state, self.models)
+
+    def tick(self) -> None:
+        """The rising edge of the clock: clocked chips sample their
+        inputs."""
+        self.evaluate()
+        for model, inputs in zip(self.models, self.model_inputs):
+            model.tick(*inputs)
+
+    def tock(self) -> None:
+        """The falling edge of the clock: clocked chips output what they
+        sampled."""
+        self.state = self.samples
+        for model in self.models:
+            model.tock()
+        self.evaluate()
+
+
+def compile_chip(name: str, library: typing.Optional[ChipLibrary] = None,
+                 check_native: bool = False) -> CompiledChip:
+    """
+    Args:
+        name (str): the name of a chip.
+        library (typing.Optional[ChipLibrary]): where chips are found, the
+            default ChipLibrary if None. Its native chips are simulated by
+            their models.
+        check_native (bool): check the models of the native chips against
+            their HDL implementations as the chip runs. Only one level is
+            checked: the parts of those implementations are simulated by
+            their models where they have one, since RAM16K, for example,
+            is millions of gates all the way down.
+
+    Returns:
+        CompiledChip: a simulation of the chip.
+    """
+    library = library or ChipLibrary()
+    checks = None
+    if check_native:
+        checks = {}
+        for chip in library.native:
+            native = library.native - {chip}
+            definition = ChipLibrary(library.directories,
+                                     library.builtin_directory,
+                                     native).get(chip)
+            native |= {part.chip for part in definition.parts
+                       if part.chip in MODELS}
+            checks[chip] = build_netlist(chip, ChipLibrary(
+                library.directories, library.builtin_directory, native))
+    return CompiledChip(build_netlist(name, library), checks)
+
+
+if "__main__" == __name__:
+    # Compiles a chip and times it on random inputs.
+    argument_parser = argparse.ArgumentParser(prog="Simulator")
+    argument_parser.add_argument("chip")
+    argument_parser.add_argument(
+        "--vectors", type=int, default=10000,
+        help="number of random input vectors to evaluate")
+    argument_parser.add_argument(
+        "--source", action="store_true", help="print the generated code")
+    arguments = argument_parser.parse_args()
+    chip = compile_chip(arguments.chip)
+    if arguments.source:
+        print(chip.source)
+    start = time.perf_counter()
+    for _ in range(arguments.vectors):
+        for pin in chip.input_names:
+            chip.set(pin, random.getrandbits(16))
+        chip.evaluate()
+    elapsed = time.perf_counter() - start
+    print("%s: %d lines, %d vectors in %.3f seconds" % (
+        arguments.chip, chip.source.count("\n"), arguments.vectors, elapsed))
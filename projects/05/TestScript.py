@@ -0,0 +1,169 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import re
+import typing
+
+SCRIPT_EXTENSION = ".tst"
+
+# The output format used when a column does not give one.
+DEFAULT_FORMAT = ("B", 1, 16, 1)
+
+# How many times a while block may run before the script is given up on:
+# the loops of the Memory and Computer scripts wait for a key press.
+WHILE_LIMIT = 100000
+
+COMPARISONS = {"=": int.__eq__, "<>": int.__ne__, "<": int.__lt__,
+               ">": int.__gt__, "<=": int.__le__, ">=": int.__ge__}
+
+_condition = re.compile(r"^\s*(\S+?)\s*(<>|<=|>=|=|<|>)\s*(\S+)\s*$")
+
+_tokens = re.compile(r'//[^\n]*|/\*.*?\*/|"[^"]*"|[,;{}]|[^\s,;{}"]+',
+                     re.DOTALL)
+
+
+def parse_script(text: str) -> typing.List[typing.Any]:
+    """Parses a test script into its commands. A command is the list of its
+    words, a repeat block is ("repeat", count, commands), with None for
+    endless repeats, and a while block is ("while", condition, commands).
+
+    Args:
+        text (str): the test script.
+
+    Returns:
+        typing.List[typing.Any]: its commands.
+    """
+    tokens = [token for token in _tokens.findall(text)
+              if not token.startswith("//") and not token.startswith("/*")]
+    commands, position = _parse_block(tokens, 0)
+    if position != len(tokens):
+        raise Exception("unbalanced } in test script")
+    return commands
+
+
+def _parse_block(tokens: typing.List[str], position: int) \
+        -> typing.Tuple[typing.List[typing.Any], int]:
+    """
+    Args:
+        tokens (typing.List[str]): the tokens of a test script.
+        position (int): index of the first token of the block.
+
+    Returns:
+        typing.Tuple[typing.List[typing.Any], int]: the commands of the
+        block, and the index after its closing } (or after the last token).
+    """
+    commands = []
+    current = []
+    while position < len(tokens):
+        token = tokens[position]
+        position += 1
+        if token in (",", ";"):
+            if current:
+                commands.append(current)
+            current = []
+        elif token == "{":
+            if not current or current[0] not in ("repeat", "while"):
+                raise Exception("unexpected { in test script")
+            body, position = _parse_block(tokens, position)
+            if current[0] == "while":
+                commands.append(("while", " ".join(current[1:]), body))
+            else:
+                commands.append(("repeat", int(current[1])
+                                 if len(current) > 1 else None, body))
+            current = []
+        elif token == "}":
+            if current:
+                commands.append(current)
+            return commands, position
+        else:
+            current.append(token)
+    if current:
+        commands.append(current)
+    return commands, position
+
+
+def parse_condition(condition: str) \
+        -> typing.Tuple[str, typing.Callable[[int, int], bool], int]:
+    """
+    Args:
+        condition (str): the condition of a while block, like out <> 75.
+
+    Returns:
+        typing.Tuple[str, typing.Callable[[int, int], bool], int]: the
+        variable it tests, the comparison, and the value it is compared to.
+    """
+    match = _condition.match(condition)
+    if match is None:
+        raise Exception("invalid condition: %s" % condition)
+    name, operator, value = match.groups()
+    return name, COMPARISONS[operator], parse_value(value)
+
+
+def parse_column(spec: str) -> typing.Tuple[str, str, int, int, int]:
+    """
+    Args:
+        spec (str): an output-list column, like out%B1.16.1 or RAM[0]%D2.6.2.
+
+    Returns:
+        typing.Tuple[str, str, int, int, int]: its variable, format (B, D, S
+        or X), left padding, width and right padding.
+    """
+    name, _, output_format = spec.partition("%")
+    if not output_format:
+        return (name,) + DEFAULT_FORMAT
+    left, width, right = output_format[1:].split(".")
+    return name, output_format[0], int(left), int(width), int(right)
+
+
+def format_header(columns: typing.List[typing.Tuple]) -> str:
+    """
+    Args:
+        columns (typing.List[typing.Tuple]): parsed output-list columns.
+
+    Returns:
+        str: the header line, with every name centered in its column.
+    """
+    cells = []
+    for name, _, left, width, right in columns:
+        size = left + width + right
+        name = name[:size]
+        before = (size - len(name)) // 2
+        cells.append(" " * before + name + " " * (size - len(name) - before))
+    return "|" + "|".join(cells) + "|"
+
+
+def format_value(value: typing.Any, output_format: str, width: int) -> str:
+    """
+    Args:
+        value (typing.Any): a signed word, or a string for S.
+        output_format (str): B, D, S or X.
+        width (int): the width of the column, without padding.
+
+    Returns:
+        str: the value as the simulators print it.
+    """
+    if output_format == "D":
+        return str(value).rjust(width)
+    if output_format == "B":
+        return format(value & 0xFFFF, "016b")[-width:].rjust(width)
+    if output_format == "X":
+        return format(value & 0xFFFF, "04X")[-width:].rjust(width)
+    return str(value).ljust(width)
+
+
+def parse_value(text: str) -> int:
+    """
+    Args:
+        text (str): a value in a set command, like 5, %D-1, %B101 or %X1F.
+
+    Returns:
+        int: the value.
+    """
+    if text.startswith("%"):
+        base = {"B": 2, "D": 10, "X": 16}[text[1].upper()]
+        return int(text[2:], base)
+    return int(text)
@@ -0,0 +1,310 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import argparse
+import sys
+import time
+import typing
+from HDLParser import ChipLibrary
+from Netlist import Netlist, build_netlist
+from Simulator import generate_source, levelize
+
+# The most input bits an output bit may depend on to be verified, by
+# default and at all: the reference model runs once per vector.
+DEFAULT_SUPPORT_LIMIT = 20
+MAX_SUPPORT_LIMIT = 24
+
+# Vectors are evaluated in batches of 2 ** BATCH_BITS, the width of the
+# slices.
+BATCH_BITS = 16
+
+
+def _mux(a: int, b: int, sel: int) -> int:
+    return b if sel else a
+
+
+def _add(a: int, b: int) -> int:
+    return (a + b) & 0xFFFF
+
+
+def _alu(x: int, y: int, zx: int, nx: int, zy: int, ny: int, f: int,
+         no: int) -> typing.Dict[str, int]:
+    x = 0 if zx else x
+    x = x ^ 0xFFFF if nx else x
+    y = 0 if zy else y
+    y = y ^ 0xFFFF if ny else y
+    out = _add(x, y) if f else x & y
+    out = out ^ 0xFFFF if no else out
+    return {"out": out, "zr": int(out == 0), "ng": out >> 15}
+
+
+def _extend_alu(x: int, y: int, instruction: int) -> typing.Dict[str, int]:
+    if not instruction >> 7 & 1:
+        return {"out": 0, "zr": 1, "ng": 0}
+    if instruction >> 8 & 1:
+        return _alu(x, y, *[instruction >> bit & 1 for bit in range(5, -1, -1)])
+    value = x if instruction >> 4 & 1 else y
+    out = (value << 1) & 0xFFFF if instruction >> 5 & 1 \
+        else value >> 1 | value & 0x8000
+    return {"out": out, "zr": int(out == 0), "ng": out >> 15}
+
+
+def _dmux(count: int) -> typing.Callable[..., typing.Dict[str, int]]:
+    names = "abcdefgh"[:count]
+    return lambda **pins: {name: pins["in"] if pins.get("sel", 0) == index
+                           else 0 for index, name in enumerate(names)}
+
+
+def _mux_way(count: int) -> typing.Callable[..., typing.Dict[str, int]]:
+    return lambda **pins: {"out": pins["abcdefgh"[pins["sel"]]]}
+
+
+# What every combinational chip of projects 01, 02 and 05 computes, as a
+# function of its input pins that returns its output pins.
+REFERENCE_MODELS = {
+    "Nand": lambda a, b: {"out": 1 - (a & b)},
+    "Not": lambda **pins: {"out": 1 - pins["in"]},
+    "And": lambda a, b: {"out": a & b},
+    "Or": lambda a, b: {"out": a | b},
+    "Xor": lambda a, b: {"out": a ^ b},
+    "Mux": lambda a, b, sel: {"out": _mux(a, b, sel)},
+    "DMux": _dmux(2),
+    "Not16": lambda **pins: {"out": pins["in"] ^ 0xFFFF},
+    "And16": lambda a, b: {"out": a & b},
+    "Or16": lambda a, b: {"out": a | b},
+    "Mux16": lambda a, b, sel: {"out": _mux(a, b, sel)},
+    "Or8Way": lambda **pins: {"out": int(pins["in"] != 0)},
+    "Mux4Way16": _mux_way(4),
+    "Mux8Way16": _mux_way(8),
+    "DMux4Way": _dmux(4),
+    "DMux8Way": _dmux(8),
+    "HalfAdder": lambda a, b: {"sum": a ^ b, "carry": a & b},
+    "FullAdder": lambda a, b, c: {"sum": (a + b + c) & 1,
+                                  "carry": (a + b + c) >> 1},
+    "Add16": lambda a, b: {"out": _add(a, b)},
+    "Inc16": lambda **pins: {"out": _add(pins["in"], 1)},
+    "ShiftLeft": lambda **pins: {"out": (pins["in"] << 1) & 0xFFFF},
+    "ShiftRight": lambda **pins: {"out": pins["in"] >> 1 |
+                                  pins["in"] & 0x8000},
+    "ALU": _alu,
+    "ExtendAlu": _extend_alu,
+}
+
+
+def input_support(netlist: Netlist) \
+        -> typing.Dict[typing.Tuple[str, int], typing.FrozenSet]:
+    """Finds the input bits each output bit depends on, through the gates.
+
+    Args:
+        netlist (Netlist): a combinational netlist.
+
+    Returns:
+        typing.Dict[typing.Tuple[str, int], typing.FrozenSet]: the (pin,
+        bit) inputs that every (pin, bit) output depends on.
+    """
+    support = {}
+    for pin, nets in netlist.inputs.items():
+        for bit, net in enumerate(nets):
+            support[net] = support.get(net, frozenset()) | {(pin, bit)}
+    for primitive in levelize(netlist):
+        if primitive.chip != "Nand":
+            raise Exception("%s is not made of Nand gates only"
+                            % netlist.name)
+        inputs = [support.get(nets[0], frozenset())
+                  for nets in primitive.inputs.values()]
+        support[primitive.outputs["out"][0]] = inputs[0] | inputs[1]
+    return {(pin, bit): support.get(net, frozenset())
+            for pin, nets in netlist.outputs.items()
+            for bit, net in enumerate(nets)}
+
+
+def _pattern(index: int, width: int) -> int:
+    """
+    Args:
+        index (int): a bit of the vector number.
+        width (int): the number of vectors, a power of 2.
+
+    Returns:
+        int: the slice whose bit v is bit index of v, for v < width.
+    """
+    period = 2 << index
+    half = ((1 << (period // 2)) - 1) << (period // 2)
+    if period >= width:
+        return half & ((1 << width) - 1)
+    return half * (((1 << width) - 1) // ((1 << period) - 1))
+
+
+def _group_outputs(supports: typing.Dict[typing.Tuple, typing.FrozenSet]) \
+        -> typing.List[typing.Tuple[typing.List, typing.Dict]]:
+    """Groups output bits that can be verified by the same evaluation, like
+    the lanes of Mux16. Every input bit of a group is given the bit of the
+    vector number it follows, so that the input bits of each output bit of
+    the group follow different bits. Input bits an output bit does not
+    depend on may follow any bit without affecting it.
+
+    Args:
+        supports (typing.Dict[typing.Tuple, typing.FrozenSet]): the input
+            support of every output bit.
+
+    Returns:
+        typing.List[typing.Tuple[typing.List, typing.Dict]]: the output
+        bits of every group, and the index its input bits follow.
+    """
+    groups = []
+    for output, support in supports.items():
+        for outputs, assignments in groups:
+            used = [assignments[input_bit] for input_bit in support
+                    if input_bit in assignments]
+            if len(set(used)) == len(used):
+                break
+        else:
+            outputs, assignments, used = [], {}, []
+            groups.append((outputs, assignments))
+        free = (index for index in range(len(support) + len(used))
+                if index not in used)
+        for input_bit in sorted(support):
+            if input_bit not in assignments:
+                assignments[input_bit] = next(free)
+        outputs.append(output)
+    return groups
+
+
+def _vector_pins(netlist: Netlist, assignments: typing.Dict,
+                 vector: int) -> typing.Dict[str, int]:
+    """
+    Args:
+        netlist (Netlist): a combinational netlist.
+        assignments (typing.Dict): the bit of the vector number every input
+            bit follows.
+        vector (int): a vector number.
+
+    Returns:
+        typing.Dict[str, int]: the values of the input pins in the vector.
+    """
+    pins = {pin: 0 for pin in netlist.inputs}
+    for (pin, bit), index in assignments.items():
+        pins[pin] |= (vector >> index & 1) << bit
+    return pins
+
+
+def support_width(name: str,
+                  library: typing.Optional[ChipLibrary] = None) -> int:
+    """
+    Args:
+        name (str): the name of a combinational chip.
+        library (typing.Optional[ChipLibrary]): where chips are found.
+
+    Returns:
+        int: the most input bits one of its output bits depends on.
+    """
+    supports = input_support(build_netlist(name, library))
+    return max(len(support) for support in supports.values())
+
+
+def verify_chip(name: str,
+                reference: typing.Optional[typing.Callable] = None,
+                library: typing.Optional[ChipLibrary] = None,
+                limit: int = DEFAULT_SUPPORT_LIMIT) -> int:
+    """Verifies a combinational chip exhaustively against a reference model.
+    Every output bit is checked on all the values of the input bits it
+    depends on, which the gates of the chip tell. The vectors are checked
+    by evaluations of the bit-sliced netlist, where bit v of every input
+    slice belongs to vector v, in batches of 2 ** BATCH_BITS vectors. A
+    mismatch raises, describing the first mismatching vector.
+
+    Args:
+        name (str): the name of the chip.
+        reference (typing.Optional[typing.Callable]): its reference model,
+            REFERENCE_MODELS[name] if None.
+        library (typing.Optional[ChipLibrary]): where chips are found.
+        limit (int): the most input bits an output bit may depend on, at
+            most MAX_SUPPORT_LIMIT.
+
+    Returns:
+        int: the number of vectors checked.
+    """
+    if limit > MAX_SUPPORT_LIMIT:
+        raise Exception("limit %d is above %d, which already takes minutes"
+                        % (limit, MAX_SUPPORT_LIMIT))
+    reference = reference or REFERENCE_MODELS[name]
+    netlist = build_netlist(name, library)
+    supports = input_support(netlist)
+    too_wide = ["%s[%d]" % output for output, support in supports.items()
+                if len(support) > limit]
+    if too_wide:
+        raise Exception("%s depend on more than %d input bits" % (
+            ", ".join(too_wide), limit))
+    namespace = {}
+    exec(compile(generate_source(netlist, sliced=True),
+                 "<chip %s>" % name, "exec"), namespace)
+    evaluate = namespace["evaluate"]
+    output_names = list(netlist.outputs)
+    checked = 0
+    for group, assignments in _group_outputs(supports):
+        bits = max(assignments.values(), default=-1) + 1
+        width = 1 << min(bits, BATCH_BITS)
+        mask = (1 << width) - 1
+        patterns = [_pattern(index, width) for index in range(BATCH_BITS)]
+        for batch in range(1 << max(bits - BATCH_BITS, 0)):
+            # The low bits of the vector number vary along the slices, and
+            # the high bits are the batch number.
+            first = batch * width
+            slices = [[(patterns[assignments[(pin, bit)]]
+                        if assignments[(pin, bit)] < BATCH_BITS else
+                        mask * (first >> assignments[(pin, bit)] & 1))
+                       if (pin, bit) in assignments else 0
+                       for bit in range(len(nets))]
+                      for pin, nets in netlist.inputs.items()]
+            outputs = evaluate(slices, [], [], mask)[0]
+            expected = {output: 0 for output in group}
+            for lane in range(width):
+                values = reference(**_vector_pins(
+                    netlist, assignments, first + lane))
+                for pin, bit in group:
+                    expected[(pin, bit)] |= (values[pin] >> bit & 1) << lane
+            for pin, bit in group:
+                got = outputs[output_names.index(pin)][bit]
+                difference = (got ^ expected[(pin, bit)]) & mask
+                if difference:
+                    lane = (difference & -difference).bit_length() - 1
+                    pins = _vector_pins(netlist, assignments, first + lane)
+                    raise Exception("%s[%d] is %d for %s" % (
+                        pin, bit, got >> lane & 1, ", ".join(
+                            "%s=%d" % item for item in pins.items())))
+            checked += width
+    return checked
+
+
+if "__main__" == __name__:
+    # Verifies chips exhaustively. If none are given, every modelled chip
+    # whose outputs depend on few enough input bits is verified.
+    argument_parser = argparse.ArgumentParser(prog="Verifier")
+    argument_parser.add_argument("chips", nargs="*")
+    argument_parser.add_argument(
+        "--limit", type=int, default=DEFAULT_SUPPORT_LIMIT,
+        help="the most input bits an output bit may depend on")
+    arguments = argument_parser.parse_args()
+    if arguments.limit > MAX_SUPPORT_LIMIT:
+        argument_parser.error("--limit may be at most %d"
+                              % MAX_SUPPORT_LIMIT)
+    failed = False
+    chips = arguments.chips
+    if not chips:
+        chips = [chip for chip in sorted(REFERENCE_MODELS)
+                 if support_width(chip) <= arguments.limit]
+    for chip in chips:
+        start = time.perf_counter()
+        try:
+            vectors = verify_chip(chip, limit=arguments.limit)
+        except Exception as error:
+            print("FAIL %s: %s" % (chip, error), file=sys.stderr)
+            failed = True
+            continue
+        print("PASS %s: %d vectors in %.1f ms" % (
+            chip, vectors, 1000 * (time.perf_counter() - start)))
+    if failed:
+        sys.exit(1)
@@ -0,0 +1,145 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import hashlib
+import os
+import shutil
+import typing
+from Code import COMP, EXTENDED_COMP, JUMP
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Files are written under this suffix and then renamed into place, so names
+# with it are unfinished (or abandoned) writes, not entries.
+TEMPORARY_SUFFIX = ".tmp"
+
+# Changing any encoding table changes the output of every file, so the
+# tables are part of every cache key.
+TABLES_FINGERPRINT = repr([sorted(COMP.items()), sorted(EXTENDED_COMP.items()),
+                           sorted(JUMP.items())]).encode()
+
+
+class AssemblyCache:
+    """
+    A directory of previously assembled outputs, keyed by a hash of the
+    assembly source and the encoding tables. Entries are evicted least
+    recently used first once their total size exceeds a limit.
+    """
+
+    def __init__(self, directory: str,
+                 max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        """Opens (and creates if needed) a cache directory.
+
+        Args:
+            directory (str): the cache directory.
+            max_bytes (int): the total size the entries are evicted down to.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+        self.entries = {}  # entry name -> (last use time, size)
+        for name in os.listdir(directory):
+            if name.endswith(TEMPORARY_SUFFIX):
+                continue
+            status = os.stat(os.path.join(directory, name))
+            self.entries[name] = (status.st_mtime, status.st_size)
+        self.total_bytes = sum(size for _, size in self.entries.values())
+
+    @staticmethod
+    def key(input_path: str, output_extension: str, options: str = "") -> str:
+        """
+        Args:
+            input_path (str): path of an .asm file.
+            output_extension (str): the extension of the output, as the same
+                source gives different .hack and packed outputs.
+            options (str): any other option that changes the output.
+
+        Returns:
+            str: the name of the cache entry of the file's output.
+        """
+        digest = hashlib.sha256(TABLES_FINGERPRINT)
+        digest.update(options.encode() + b"\0")
+        with open(input_path, 'rb') as input_file:
+            for chunk in iter(lambda: input_file.read(1 << 16), b""):
+                digest.update(chunk)
+        return digest.hexdigest() + output_extension
+
+    def fetch(self, key: str, output_path: str) -> bool:
+        """Copies the cached output of the given key to output_path. The
+        output is never a link to the entry, so writing it later cannot
+        change the cache.
+
+        Args:
+            key (str): a key returned by key().
+            output_path (str): where the output should be.
+
+        Returns:
+            bool: True on a hit, False if the key is not cached.
+        """
+        entry_path = os.path.join(self.directory, key)
+        if key not in self.entries:
+            self.misses += 1
+            return False
+        temporary_path = output_path + ".%d%s" % (os.getpid(),
+                                                   TEMPORARY_SUFFIX)
+        try:
+            shutil.copyfile(entry_path, temporary_path)
+        except FileNotFoundError:
+            # The entry was removed behind our back.
+            self.total_bytes -= self.entries.pop(key)[1]
+            self.misses += 1
+            return False
+        os.replace(temporary_path, output_path)
+        self.hits += 1
+        os.utime(entry_path)
+        self.entries[key] = (os.stat(entry_path).st_mtime,
+                             self.entries[key][1])
+        return True
+
+    def store(self, key: str, output_path: str) -> None:
+        """Adds a freshly assembled output to the cache, then evicts the
+        least recently used entries while the cache is too big.
+
+        Args:
+            key (str): a key returned by key().
+            output_path (str): the output to store.
+        """
+        entry_path = os.path.join(self.directory, key)
+        temporary_path = entry_path + ".%d%s" % (os.getpid(),
+                                                  TEMPORARY_SUFFIX)
+        shutil.copyfile(output_path, temporary_path)
+        os.replace(temporary_path, entry_path)
+        if key in self.entries:
+            self.total_bytes -= self.entries[key][1]
+        status = os.stat(entry_path)
+        self.entries[key] = (status.st_mtime, status.st_size)
+        self.total_bytes += status.st_size
+        self.evict()
+
+    def evict(self) -> None:
+        """Removes least recently used entries until the total size of the
+        cache is at most max_bytes.
+        """
+        if self.total_bytes <= self.max_bytes:
+            return
+        for name in sorted(self.entries, key=lambda name: self.entries[name]):
+            if self.total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+            self.total_bytes -= self.entries.pop(name)[1]
+
+    def report(self) -> str:
+        """
+        Returns:
+            str: a line summarizing the hits and misses of this run.
+        """
+        return "assembly cache: %d hits, %d misses" % (self.hits, self.misses)
@@ -0,0 +1,151 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import argparse
+import os
+import typing
+from CPUEmulator import ROM_SIZE, RAM_SIZE, load_program
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class BatchEmulator:
+    """
+    Runs many Hack machines with the same ROM in lockstep. Their A, D, PC and
+    RAM are numpy arrays, and every step executes one instruction on all of
+    them at once: the instruction word of each machine is gathered by its
+    own PC, so machines whose PCs diverged keep running together, and the
+    ALU is evaluated from the control bits of the words. Machines that halted
+    are masked out.
+    """
+
+    def __init__(self, rom: typing.Iterable[int], count: int) -> None:
+        """Loads a program into count machines with zeroed registers and RAM.
+
+        Args:
+            rom (typing.Iterable[int]): the 16-bit ROM words.
+            count (int): the number of machines.
+        """
+        if numpy is None:
+            raise Exception("BatchEmulator requires numpy")
+        words = numpy.fromiter(rom, dtype=numpy.int32)
+        if len(words) > ROM_SIZE:
+            raise Exception("the program does not fit in ROM (%d words)"
+                            % len(words))
+        self.rom = numpy.zeros(ROM_SIZE, dtype=numpy.int32)
+        self.rom[:len(words)] = words
+        self.count = count
+        self.rows = numpy.arange(count)
+        self.ram = numpy.zeros((count, RAM_SIZE), dtype=numpy.int16)
+        self.a = numpy.zeros(count, dtype=numpy.int32)
+        self.d = numpy.zeros(count, dtype=numpy.int32)
+        self.pc = numpy.zeros(count, dtype=numpy.int32)
+        self.halted = numpy.zeros(count, dtype=bool)
+        self.cycles = numpy.zeros(count, dtype=numpy.int64)
+
+    def peek(self, address: int) -> "numpy.ndarray":
+        """
+        Args:
+            address (int): a RAM address.
+
+        Returns:
+            numpy.ndarray: the signed word at the address, of every machine.
+        """
+        return self.ram[:, address].copy()
+
+    def poke(self, address: int, values: typing.Any) -> None:
+        """
+        Args:
+            address (int): a RAM address.
+            values (typing.Any): a value for every machine, or one value for
+                all of them, wrapped to 16 bits.
+        """
+        values = numpy.asarray(values, dtype=numpy.int64)
+        self.ram[:, address] = ((values + 0x8000) & 0xFFFF) - 0x8000
+
+    def step(self) -> None:
+        """Executes one instruction on every machine that did not halt."""
+        active = ~self.halted
+        a = self.a
+        d = self.d
+        pc = self.pc
+        word = self.rom[pc]
+        is_c = (word & 0x8000) != 0
+        m = self.ram[self.rows, a & 0x7FFF].astype(numpy.int32)
+        y = numpy.where(word & 0x1000, m, a)
+        # The regular ALU, from the zx, nx, zy, ny, f and no bits.
+        x = numpy.where(word & 0x0800, 0, d)
+        x = numpy.where(word & 0x0400, ~x, x)
+        alu_y = numpy.where(word & 0x0200, 0, y)
+        alu_y = numpy.where(word & 0x0100, ~alu_y, alu_y)
+        out = numpy.where(word & 0x0080, x + alu_y, x & alu_y)
+        out = numpy.where(word & 0x0040, ~out, out)
+        # The shifts of the ExtendAlu, and its 0 output for other words.
+        shifted = numpy.where(word & 0x0400, d, y)
+        shifted = numpy.where(word & 0x0800, shifted << 1, shifted >> 1)
+        out = numpy.where(word & 0x4000, out, shifted)
+        out = numpy.where(word & 0x2000, out, 0)
+        out = ((out + 0x8000) & 0xFFFF) - 0x8000
+        dest = numpy.where(is_c & active, (word >> 3) & 7, 0)
+        jump = numpy.where(is_c, word & 7, 0)
+        taken = (((out < 0) & ((jump & 4) != 0)) |
+                 ((out == 0) & ((jump & 2) != 0)) |
+                 ((out > 0) & ((jump & 1) != 0)))
+        target = a & 0x7FFF
+        next_pc = numpy.where(taken, target, (pc + 1) & 0x7FFF)
+        writes = (dest & 1) != 0
+        self.ram[self.rows[writes], target[writes]] = out[writes]
+        self.d = numpy.where((dest & 2) != 0, out, d)
+        new_a = numpy.where((dest & 4) != 0, out, a)
+        self.a = numpy.where(is_c | ~active, new_a, word)
+        self.pc = numpy.where(active, next_pc, pc)
+        self.cycles += active
+        self.halted |= active & (jump == 7) & (dest == 0) & \
+            (target == pc - 1) & (self.rom[target] == target)
+
+    def run(self, max_steps: int) -> int:
+        """Steps the machines until max_steps steps were made or all of them
+        halted, i.e. reached the usual (END) @END 0;JMP loop.
+
+        Args:
+            max_steps (int): the maximal number of steps.
+
+        Returns:
+            int: the number of steps made.
+        """
+        steps = 0
+        while steps < max_steps and not self.halted.all():
+            self.step()
+            steps += 1
+        return steps
+
+
+if "__main__" == __name__:
+    # Runs a program on every value of RAM[0] in a range, with RAM[1] fixed,
+    # and prints RAM[2] of every machine, e.g. for Mult.
+    argument_parser = argparse.ArgumentParser(prog="BatchEmulator")
+    argument_parser.add_argument("input_path")
+    argument_parser.add_argument("first", type=int)
+    argument_parser.add_argument("last", type=int)
+    argument_parser.add_argument("--r1", type=int, default=0)
+    argument_parser.add_argument(
+        "--steps", type=int, default=10 ** 6,
+        help="maximal number of steps")
+    arguments = argument_parser.parse_args()
+    inputs = range(arguments.first, arguments.last + 1)
+    emulator = BatchEmulator(load_program(os.path.abspath(
+        arguments.input_path)), len(inputs))
+    emulator.poke(0, list(inputs))
+    emulator.poke(1, arguments.r1)
+    steps = emulator.run(arguments.steps)
+    print("%d steps, %d of %d machines halted" % (
+        steps, emulator.halted.sum(), emulator.count))
+    for value, result in zip(inputs, emulator.peek(2)):
+        print("R0=%d R2=%d" % (value, result))
@@ -0,0 +1,248 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import argparse
+import hashlib
+import os
+import typing
+from Code import COMP_WORDS
+from CPUEmulator import CPUEmulator, ROM_SIZE, DEST_A, DEST_D, DEST_M, \
+    load_program
+
+# The most instructions compiled into one block, for code with no jumps.
+BLOCK_LIMIT = 256
+
+# Python expressions of every comp mnemonic, over the locals a and d and the
+# M expression {m}. Values are (expression, whether it must be wrapped).
+COMP_EXPRESSIONS = {
+    "0": ("0", False), "1": ("1", False), "-1": ("-1", False),
+    "D": ("d", False), "A": ("a", False), "M": ("{m}", False),
+    "!D": ("~d", False), "!A": ("~a", False), "!M": ("~{m}", False),
+    "-D": ("-d", True), "-A": ("-a", True), "-M": ("-{m}", True),
+    "D+1": ("d + 1", True), "A+1": ("a + 1", True), "M+1": ("{m} + 1", True),
+    "D-1": ("d - 1", True), "A-1": ("a - 1", True), "M-1": ("{m} - 1", True),
+    "D+A": ("d + a", True), "D+M": ("d + {m}", True),
+    "D-A": ("d - a", True), "D-M": ("d - {m}", True),
+    "A-D": ("a - d", True), "M-D": ("{m} - d", True),
+    "D&A": ("d & a", False), "D&M": ("d & {m}", False),
+    "D|A": ("d | a", False), "D|M": ("d | {m}", False),
+    "A<<": ("a << 1", True), "D<<": ("d << 1", True), "M<<": ("{m} << 1", True),
+    "A>>": ("a >> 1", False), "D>>": ("d >> 1", False),
+    "M>>": ("{m} >> 1", False),
+}
+
+# Python conditions of every jump, over the ALU output t.
+JUMP_CONDITIONS = {1: "t > 0", 2: "t == 0", 3: "t >= 0", 4: "t < 0",
+                   5: "t != 0", 6: "t <= 0"}
+
+# Compiled dispatch tables, by the sha256 of the ROM they were compiled from.
+_compiled_roms = {}
+
+
+def comp_expression(word: int, known_a: typing.Optional[int],
+                    mnemonics: typing.Dict[int, str]) -> str:
+    """
+    Args:
+        word (int): a C-instruction word.
+        known_a (typing.Optional[int]): the value of A, if known when
+            compiling.
+        mnemonics (typing.Dict[int, str]): comp mnemonics by word >> 6.
+
+    Returns:
+        str: a Python expression of the comp of the instruction, or "" if it
+        has no mnemonic.
+    """
+    mnemonic = mnemonics.get(word >> 6)
+    if mnemonic is None:
+        return ""
+    expression, wraps = COMP_EXPRESSIONS[mnemonic]
+    m = "ram[%d]" % (known_a & 0x7FFF) if known_a is not None \
+        else "ram[a & 32767]"
+    expression = expression.format(m=m)
+    if wraps:
+        expression = "((%s) + 32768 & 65535) - 32768" % expression
+    return expression
+
+
+def generate_block(rom: typing.Sequence[int], start: int) \
+        -> typing.Tuple[str, str, int]:
+    """Generates the Python source of the basic block that starts at the
+    given address. It runs up to and including the first jump instruction,
+    and returns (a, d, next pc, instructions executed). A block that loops to
+    itself with @start;0;JMP halts, and returns ~start as the next pc.
+
+    Args:
+        rom (typing.Sequence[int]): the 16-bit ROM words.
+        start (int): address of the first instruction of the block.
+
+    Returns:
+        typing.Tuple[str, str, int]: the source, the name of the function it
+        defines, and the number of instructions in the block.
+    """
+    mnemonics = {word >> 6: mnemonic for mnemonic, word in COMP_WORDS.items()}
+    name = "block_%d" % start
+    lines = ["def %s(a, d, ram):" % name]
+    known_a = None
+    pc = start
+    count = 0
+    while True:
+        word = rom[pc] if pc < len(rom) else 0
+        pc = (pc + 1) & 0x7FFF
+        count += 1
+        if not word & 0x8000:
+            lines.append("    a = %d" % word)
+            known_a = word
+        else:
+            dest = (word >> 3) & 7
+            jump = word & 7
+            expression = comp_expression(word, known_a, mnemonics) or \
+                "f_%d(a, d, ram)" % word
+            address = "%d" % (known_a & 0x7FFF) if known_a is not None \
+                else "a & 32767"
+            if jump and dest & DEST_A and known_a is None:
+                lines.append("    j = a & 32767")
+            target = "%d" % (known_a & 0x7FFF) if known_a is not None \
+                else ("j" if dest & DEST_A else "a & 32767")
+            if jump == 7 and not dest and count == 2 and \
+                    known_a == start and rom[start] == start:
+                target = "%d" % ~start
+            writes = [(DEST_M, "ram[%s]" % address), (DEST_D, "d"),
+                      (DEST_A, "a")]
+            targets = [variable for bit, variable in writes if dest & bit]
+            if len(targets) == 1 and jump in (0, 7):
+                lines.append("    %s = %s" % (targets[0], expression))
+            elif targets or jump not in (0, 7):
+                lines.append("    t = %s" % expression)
+                lines.extend("    %s = t" % variable for variable in targets)
+            if dest & DEST_A:
+                known_a = None
+            if jump == 7:
+                lines.append("    return a, d, %s, %d" % (target, count))
+                break
+            if jump:
+                lines.append("    if %s:" % JUMP_CONDITIONS[jump])
+                lines.append("        return a, d, %s, %d" % (target, count))
+                break
+        if count == BLOCK_LIMIT or pc == 0:
+            break
+    lines.append("    return a, d, %d, %d" % (pc, count))
+    return "\n".join(lines) + "\n", name, count
+
+
+class BlockEmulator(CPUEmulator):
+    """
+    Runs Hack machine code by compiling it into Python functions, one per
+    basic block, with A, D and PC kept in locals. Blocks are compiled the
+    first time they are jumped to, so computed jumps (like the returns of VM
+    code) work too, and are shared by every emulator running the same ROM.
+    """
+
+    def __init__(self, rom: typing.Iterable[int]) -> None:
+        """Loads a program and zeroes the registers and the RAM.
+
+        Args:
+            rom (typing.Iterable[int]): the 16-bit ROM words.
+        """
+        super().__init__(rom)
+        digest = hashlib.sha256(self.rom.tobytes()).hexdigest()
+        self.blocks = _compiled_roms.setdefault(digest, [None] * ROM_SIZE)
+        # Comps without a mnemonic are called through their predecoded
+        # functions.
+        self.namespace = {"f_%d" % word: operation[0] for word, operation in
+                          zip(self.rom, self.program)
+                          if word & 0x8000}
+
+    def compile_block(self, start: int) -> typing.Callable:
+        """
+        Args:
+            start (int): address of the first instruction of the block.
+
+        Returns:
+            typing.Callable: the compiled block, which is also stored in the
+            dispatch table. Its size attribute is its number of instructions.
+        """
+        source, name, size = generate_block(self.rom, start)
+        namespace = dict(self.namespace)
+        exec(compile(source, "<hack %s>" % name, "exec"), namespace)
+        block = namespace[name]
+        block.size = size
+        self.blocks[start] = block
+        return block
+
+    def run(self, max_steps: int) -> int:
+        """Executes blocks until at least max_steps instructions were executed
+        or the program halts. The last block always runs to its end, so up to
+        BLOCK_LIMIT - 1 more instructions may be executed.
+
+        Args:
+            max_steps (int): the number of instructions to execute.
+
+        Returns:
+            int: the number of instructions executed.
+        """
+        blocks = self.blocks
+        ram = self.ram
+        a = self.a
+        d = self.d
+        pc = self.pc
+        steps = 0
+        while steps < max_steps:
+            block = blocks[pc]
+            if block is None:
+                block = self.compile_block(pc)
+            a, d, pc, count = block(a, d, ram)
+            steps += count
+            if pc < 0:
+                pc = ~pc
+                self.halted = True
+                break
+        self.a = a
+        self.d = d
+        self.pc = pc
+        self.cycles += steps
+        return steps
+
+    def advance(self, count: int) -> None:
+        """Executes exactly count instructions, like CPUEmulator.advance:
+        whole blocks while they fit in count, and the rest one instruction
+        at a time.
+
+        Args:
+            count (int): the number of instructions to execute.
+        """
+        remaining = count
+        self.halted = False
+        while remaining and not self.halted:
+            block = self.blocks[self.pc]
+            if block is None:
+                block = self.compile_block(self.pc)
+            if block.size > remaining:
+                break
+            remaining -= self.run(block.size)
+        if remaining and not self.halted:
+            remaining -= CPUEmulator.run(self, remaining)
+        if remaining:
+            self.cycles += remaining
+            if remaining % 2:
+                self.pc += 1
+
+
+if "__main__" == __name__:
+    # Prints the generated source of every block reachable when running a
+    # program.
+    argument_parser = argparse.ArgumentParser(prog="BlockCompiler")
+    argument_parser.add_argument("input_path")
+    argument_parser.add_argument(
+        "--steps", type=int, default=10 ** 7,
+        help="maximal number of instructions to execute")
+    arguments = argument_parser.parse_args()
+    emulator = BlockEmulator(load_program(os.path.abspath(
+        arguments.input_path)))
+    emulator.run(arguments.steps)
+    for address, compiled in enumerate(emulator.blocks):
+        if compiled is not None:
+            print(generate_block(emulator.rom, address)[0])
@@ -0,0 +1,320 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import argparse
+import copy
+import os
+import typing
+from array import array
+from Code import COMP_WORDS
+
+ROM_SIZE = 32768
+RAM_SIZE = 32768
+SCREEN_ADDRESS = 16384
+KEYBOARD_ADDRESS = 24576
+
+# Masks of the predecoded dest field.
+DEST_A = 4
+DEST_D = 2
+DEST_M = 1
+# Bits of the predecoded jump field, as in the instruction.
+JUMP_LT = 4
+JUMP_EQ = 2
+JUMP_GT = 1
+
+
+def wrap(value: int) -> int:
+    """
+    Args:
+        value (int): an integer.
+
+    Returns:
+        int: the value as a signed 16-bit word, i.e. in [-32768, 32767].
+    """
+    return ((value + 0x8000) & 0xFFFF) - 0x8000
+
+
+# Every comp mnemonic as a function of A, D and the RAM, that returns a
+# signed 16-bit result. M is RAM[A], and the ALU never needs more than that.
+COMP_FUNCTIONS = {
+    "0": lambda a, d, ram: 0,
+    "1": lambda a, d, ram: 1,
+    "-1": lambda a, d, ram: -1,
+    "D": lambda a, d, ram: d,
+    "A": lambda a, d, ram: a,
+    "M": lambda a, d, ram: ram[a & 0x7FFF],
+    "!D": lambda a, d, ram: ~d,
+    "!A": lambda a, d, ram: ~a,
+    "!M": lambda a, d, ram: ~ram[a & 0x7FFF],
+    "-D": lambda a, d, ram: wrap(-d),
+    "-A": lambda a, d, ram: wrap(-a),
+    "-M": lambda a, d, ram: wrap(-ram[a & 0x7FFF]),
+    "D+1": lambda a, d, ram: wrap(d + 1),
+    "A+1": lambda a, d, ram: wrap(a + 1),
+    "M+1": lambda a, d, ram: wrap(ram[a & 0x7FFF] + 1),
+    "D-1": lambda a, d, ram: wrap(d - 1),
+    "A-1": lambda a, d, ram: wrap(a - 1),
+    "M-1": lambda a, d, ram: wrap(ram[a & 0x7FFF] - 1),
+    "D+A": lambda a, d, ram: wrap(d + a),
+    "D+M": lambda a, d, ram: wrap(d + ram[a & 0x7FFF]),
+    "D-A": lambda a, d, ram: wrap(d - a),
+    "D-M": lambda a, d, ram: wrap(d - ram[a & 0x7FFF]),
+    "A-D": lambda a, d, ram: wrap(a - d),
+    "M-D": lambda a, d, ram: wrap(ram[a & 0x7FFF] - d),
+    "D&A": lambda a, d, ram: d & a,
+    "D&M": lambda a, d, ram: d & ram[a & 0x7FFF],
+    "D|A": lambda a, d, ram: d | a,
+    "D|M": lambda a, d, ram: d | ram[a & 0x7FFF],
+    "A<<": lambda a, d, ram: wrap(a << 1),
+    "D<<": lambda a, d, ram: wrap(d << 1),
+    "M<<": lambda a, d, ram: wrap(ram[a & 0x7FFF] << 1),
+    "A>>": lambda a, d, ram: a >> 1,
+    "D>>": lambda a, d, ram: d >> 1,
+    "M>>": lambda a, d, ram: ram[a & 0x7FFF] >> 1,
+}
+
+
+def alu_function(word: int) -> typing.Callable[[int, int, array], int]:
+    """Builds the comp function of a C-instruction from its control bits, as
+    the (extended) ALU computes it, for words no mnemonic encodes.
+
+    Args:
+        word (int): a C-instruction word.
+
+    Returns:
+        typing.Callable[[int, int, array], int]: its comp function.
+    """
+    uses_m = word & 0x1000
+    if not word & 0x2000:
+        # Neither a regular nor a shift instruction: the ExtendAlu outputs 0.
+        return COMP_FUNCTIONS["0"]
+    if not word & 0x4000:
+        shift_d = word & 0x0400
+        shift_left = word & 0x0800
+
+        def shift(a: int, d: int, ram: array) -> int:
+            value = d if shift_d else (ram[a & 0x7FFF] if uses_m else a)
+            return wrap(value << 1) if shift_left else value >> 1
+        return shift
+    zx, nx, zy, ny, f, no = [(word >> bit) & 1 for bit in range(11, 5, -1)]
+
+    def alu(a: int, d: int, ram: array) -> int:
+        x = 0 if zx else d
+        x = ~x if nx else x
+        y = ram[a & 0x7FFF] if uses_m else a
+        y = 0 if zy else y
+        y = ~y if ny else y
+        out = wrap(x + y) if f else x & y
+        return ~out if no else out
+    return alu
+
+
+def predecode(rom: typing.Iterable[int]) -> typing.List[typing.Any]:
+    """Decodes every ROM word once. A-instructions become the int they load,
+    and C-instructions a (comp function, dest mask, jump mask) tuple. Equal
+    words share one tuple. The result is padded with @0 up to ROM_SIZE, like
+    the zeroed ROM of the Hack computer.
+
+    Args:
+        rom (typing.Iterable[int]): the 16-bit ROM words.
+
+    Returns:
+        typing.List[typing.Any]: the predecoded program.
+    """
+    mnemonics = {word >> 6: mnemonic for mnemonic, word in COMP_WORDS.items()}
+    decoded = {}
+    program = []
+    for word in rom:
+        if not word & 0x8000:
+            program.append(word)
+            continue
+        operation = decoded.get(word)
+        if operation is None:
+            mnemonic = mnemonics.get(word >> 6)
+            function = COMP_FUNCTIONS[mnemonic] if mnemonic is not None \
+                else alu_function(word)
+            operation = (function, (word >> 3) & 7, word & 7)
+            decoded[word] = operation
+        program.append(operation)
+    if len(program) > ROM_SIZE:
+        raise Exception("the program does not fit in ROM (%d words)"
+                        % len(program))
+    program.extend([0] * (ROM_SIZE - len(program)))
+    return program
+
+
+class CPUEmulator:
+    """
+    Runs Hack machine code headlessly. The ROM is predecoded once, and the
+    registers are kept in locals of a tight loop while running. RAM is an
+    array('h') of signed words, covering the screen and the keyboard.
+    """
+
+    def __init__(self, rom: typing.Iterable[int]) -> None:
+        """Loads a program and zeroes the registers and the RAM.
+
+        Args:
+            rom (typing.Iterable[int]): the 16-bit ROM words.
+        """
+        self.rom = array('H', rom)
+        self.program = predecode(self.rom)
+        self.ram = array('h', bytes(2 * RAM_SIZE))
+        self.a = 0
+        self.d = 0
+        self.pc = 0
+        self.cycles = 0
+        self.halted = False
+
+    def clone(self) -> "CPUEmulator":
+        """
+        Returns:
+            CPUEmulator: a copy of the emulator in the same state, which
+            shares the ROM and runs independently of it. Subclasses copy
+            their own state too.
+        """
+        clone = copy.copy(self)
+        clone.ram = array('h', self.ram)
+        return clone
+
+    def reset(self) -> None:
+        """Jumps back to address 0, like the reset input of the CPU."""
+        self.pc = 0
+        self.halted = False
+
+    def peek(self, address: int) -> int:
+        """
+        Args:
+            address (int): a RAM address.
+
+        Returns:
+            int: the signed word at the address.
+        """
+        return self.ram[address]
+
+    def poke(self, address: int, value: int) -> None:
+        """
+        Args:
+            address (int): a RAM address.
+            value (int): the value to store, wrapped to 16 bits.
+        """
+        self.ram[address] = wrap(value)
+
+    def set_keyboard(self, key: int) -> None:
+        """
+        Args:
+            key (int): the code of the pressed key, or 0 for none.
+        """
+        self.ram[KEYBOARD_ADDRESS] = key
+
+    def run(self, max_steps: int) -> int:
+        """Executes instructions until max_steps were executed or the program
+        halts, i.e. reaches the usual (END) @END 0;JMP loop.
+
+        Args:
+            max_steps (int): the maximal number of instructions to execute.
+
+        Returns:
+            int: the number of instructions executed.
+        """
+        program = self.program
+        ram = self.ram
+        a = self.a
+        d = self.d
+        pc = self.pc
+        steps = 0
+        while steps < max_steps:
+            steps += 1
+            operation = program[pc]
+            if operation.__class__ is int:
+                a = operation
+                pc = (pc + 1) & 0x7FFF
+                continue
+            function, dest, jump = operation
+            out = function(a, d, ram)
+            target = a
+            if dest:
+                if dest & DEST_M:
+                    ram[a & 0x7FFF] = out
+                if dest & DEST_D:
+                    d = out
+                if dest & DEST_A:
+                    a = out
+            if jump and ((out < 0 and jump & JUMP_LT) or
+                         (out == 0 and jump & JUMP_EQ) or
+                         (out > 0 and jump & JUMP_GT)):
+                target &= 0x7FFF
+                if target == pc - 1 and program[target] == target and \
+                        jump == 7 and not dest:
+                    self.halted = True
+                    pc = target
+                    break
+                pc = target
+            else:
+                pc = (pc + 1) & 0x7FFF
+        self.a = a
+        self.d = d
+        self.pc = pc
+        self.cycles += steps
+        return steps
+
+    def advance(self, count: int) -> None:
+        """Executes exactly count instructions. Once the program halts, the
+        rest of them are spent in its END loop, which alternates between the
+        @END and the 0;JMP without changing anything else.
+
+        Args:
+            count (int): the number of instructions to execute.
+        """
+        remaining = count - self.run(count)
+        if remaining:
+            self.cycles += remaining
+            if remaining % 2:
+                self.pc += 1
+
+
+def load_program(path: str) -> typing.Sequence[int]:
+    """Loads a program to run: a .hack file, a packed image or an .asm file,
+    which is assembled in memory.
+
+    Args:
+        path (str): path of the program.
+
+    Returns:
+        typing.Sequence[int]: its ROM words.
+    """
+    if os.path.splitext(path)[1].lower() == ".asm":
+        from Main import assemble
+        with open(path, 'r') as input_file:
+            return assemble(input_file)[0]
+    from PackedHack import load_rom
+    return load_rom(path)
+
+
+if "__main__" == __name__:
+    # Runs a program and prints the registers and the first RAM words.
+    argument_parser = argparse.ArgumentParser(prog="CPUEmulator")
+    argument_parser.add_argument("input_path")
+    argument_parser.add_argument(
+        "--steps", type=int, default=10 ** 7,
+        help="maximal number of instructions to execute")
+    argument_parser.add_argument(
+        "--set", action="append", default=[], metavar="ADDRESS=VALUE",
+        help="set a RAM word before running")
+    argument_parser.add_argument(
+        "--dump", type=int, default=16, metavar="N",
+        help="print RAM[0..N-1] after running")
+    arguments = argument_parser.parse_args()
+    emulator = CPUEmulator(load_program(os.path.abspath(arguments.input_path)))
+    for assignment in arguments.set:
+        address, value = assignment.split("=")
+        emulator.poke(int(address), int(value))
+    steps = emulator.run(arguments.steps)
+    print("%d instructions executed%s" % (
+        steps, ", halted" if emulator.halted else ""))
+    print("A=%d D=%d PC=%d" % (emulator.a, emulator.d, emulator.pc))
+    for address in range(arguments.dump):
+        print("RAM[%d]=%d" % (address, emulator.peek(address)))
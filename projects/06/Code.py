@@ -5,6 +5,15 @@ was written by Aviv Yaish. It is an extension to the specifications given
 as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
 Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
 """
+import itertools
+from Parser import split_c_command
+
+# Maximal number of distinct instructions remembered by a Code object.
+DEFAULT_CACHE_SIZE = 4096
+
+# The largest value an A-instruction can load: its most significant bit must
+# be 0.
+MAX_ADDRESS = 0x7FFF
 
 JUMP = {"": "000", "JGT": "001", "JEQ": "010", "JGE": "011", "JLT": "100",
         "JNE": "101", "JLE": "110", "JMP": "111"}
@@ -16,10 +25,72 @@ COMP = {"0": "101010", "1": "111111", "-1": "111010", "D": "001100",
 EXTENDED_COMP = {"A<<": "0100000", "D<<": "0110000", "M<<": "1100000", "A>>": "0000000",
                  "D>>": "0010000", "M>>": "1000000"}
 
+# Integer versions of the tables above, already shifted into place inside a
+# 16-bit instruction word, so that a C-instruction is encoded with two ORs.
+JUMP_WORDS = {mnemonic: int(bits, 2) for mnemonic, bits in JUMP.items()}
+DEST_WORDS = {}
+for _length in range(4):
+    for _letters in itertools.permutations("ADM", _length):
+        DEST_WORDS["".join(_letters)] = (("A" in _letters) << 5) | \
+            (("D" in _letters) << 4) | (("M" in _letters) << 3)
+COMP_WORDS = {}
+for _mnemonic, _bits in COMP.items():
+    COMP_WORDS[_mnemonic] = (0b111 << 13) | (int(_bits, 2) << 6)
+    if 'A' in _mnemonic:
+        COMP_WORDS[_mnemonic.replace('A', 'M')] = \
+            (0b1111 << 12) | (int(_bits, 2) << 6)
+for _mnemonic, _bits in EXTENDED_COMP.items():
+    COMP_WORDS[_mnemonic] = (0b101 << 13) | (int(_bits, 2) << 6)
+
 
 class Code:
     """Translates Hack assembly language mnemonics into binary codes."""
 
+    def __init__(self, cache_size: int = DEFAULT_CACHE_SIZE) -> None:
+        """Creates a translator with an empty instruction cache, that maps
+        the text of already encoded instructions to their words.
+
+        Args:
+            cache_size (int): maximal number of cached instructions. When it
+            is reached, the oldest entry is evicted.
+        """
+        self.cache_size = cache_size
+        self.cache = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def encode(self, command: str) -> int:
+        """Encodes a cleaned C-command or a decimal A-command, looking it up
+        in the cache first so every distinct instruction is parsed once.
+
+        Args:
+            command (str): a command without white space and comments.
+
+        Returns:
+            int: the 16-bit word of the given command.
+        """
+        word = self.cache.get(command)
+        if word is not None:
+            self.cache_hits += 1
+            return word
+        self.cache_misses += 1
+        if command[0] == "@":
+            word = self.encode_a(int(command[1:]))
+        else:
+            word = self.encode_c(*split_c_command(command))
+        if len(self.cache) >= self.cache_size:
+            del self.cache[next(iter(self.cache))]
+        self.cache[command] = word
+        return word
+
+    def cache_hit_rate(self) -> float:
+        """
+        Returns:
+            float: the fraction of encode calls answered from the cache.
+        """
+        total = self.cache_hits + self.cache_misses
+        return self.cache_hits / total if total else 0.0
+
     @staticmethod
     def dest(mnemonic: str) -> str:
         """
@@ -62,3 +133,41 @@ class Code:
             str: 3-bit long binary code of the given mnemonic.
         """
         return JUMP[mnemonic]
+
+    @staticmethod
+    def encode_c(dest: str, comp: str, jump: str) -> int:
+        """
+        Args:
+            dest (str): a dest mnemonic string.
+            comp (str): a comp mnemonic string.
+            jump (str): a jump mnemonic string.
+
+        Returns:
+            int: the 16-bit C-instruction word made of the given mnemonics.
+        """
+        return COMP_WORDS[comp] | DEST_WORDS[dest] | JUMP_WORDS[jump]
+
+    @staticmethod
+    def encode_a(address: int) -> int:
+        """
+        Args:
+            address (int): the value loaded by an A-instruction.
+
+        Returns:
+            int: the 16-bit A-instruction word loading the given value.
+        """
+        if not 0 <= address <= MAX_ADDRESS:
+            raise Exception("@%d does not fit in an A-instruction (0-%d)"
+                            % (address, MAX_ADDRESS))
+        return address
+
+    @staticmethod
+    def to_text(word: int) -> str:
+        """
+        Args:
+            word (int): a 16-bit instruction word.
+
+        Returns:
+            str: the word as 16 '0'/'1' characters, as written in .hack files.
+        """
+        return format(word, "016b")
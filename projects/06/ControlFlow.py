@@ -0,0 +1,133 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import typing
+from Optimizer import jumps_to_decimal_address
+
+
+class BasicBlock:
+    """A run of instructions that is entered only at its start, through its
+    labels, and left only at its end."""
+
+    def __init__(self, labels: typing.List[str]) -> None:
+        """
+        Args:
+            labels (typing.List[str]): the labels right before the block.
+        """
+        self.labels = labels
+        self.instructions = []
+
+    def falls_through(self) -> bool:
+        """
+        Returns:
+            bool: False if the block ends with an unconditional jump.
+        """
+        return not self.instructions or \
+            not self.instructions[-1].endswith(";JMP")
+
+
+def split_basic_blocks(commands: typing.Iterable[str]) \
+        -> typing.List[BasicBlock]:
+    """Splits cleaned commands into basic blocks: a new block starts at every
+    label and after every jump.
+
+    Args:
+        commands (typing.Iterable[str]): cleaned commands.
+
+    Returns:
+        typing.List[BasicBlock]: the blocks, in program order.
+    """
+    blocks = [BasicBlock([])]
+    for command in commands:
+        if command[0] == "(":
+            if blocks[-1].instructions:
+                blocks.append(BasicBlock([]))
+            blocks[-1].labels.append(command[1:-1])
+        else:
+            blocks[-1].instructions.append(command)
+            if ";" in command:
+                blocks.append(BasicBlock([]))
+    return blocks
+
+
+class DeadCodeEliminator:
+    """
+    Drops the basic blocks that cannot be reached from address 0, like the
+    functions VMtranslator emits for every OS routine, called or not. A block
+    is reachable if it is the first one, if a reachable block falls through
+    to it, or if a reachable block loads one of its labels into A. The last
+    rule also covers return addresses and other indirect jumps, as every
+    address the program can jump to has to be loaded from a label first.
+    Labels that no kept instruction refers to are dropped as well.
+    Programs that jump to decimal addresses are left untouched.
+    """
+
+    def __init__(self) -> None:
+        """Creates an eliminator with zeroed counters."""
+        self.removed_instructions = 0
+        self.removed_labels = 0
+        self.skipped = False
+
+    def report(self) -> str:
+        """
+        Returns:
+            str: a line summarizing what was removed.
+        """
+        if self.skipped:
+            return "dead code kept, the program jumps to decimal addresses"
+        return "%d unreachable instructions and %d dead labels removed" % (
+            self.removed_instructions, self.removed_labels)
+
+    def optimize(self, commands: typing.Iterable[str]) -> typing.List[str]:
+        """
+        Args:
+            commands (typing.Iterable[str]): cleaned commands of a whole
+                program, as yielded by Parser.stream_commands.
+
+        Returns:
+            typing.List[str]: the commands of the reachable blocks.
+        """
+        commands = list(commands)
+        if jumps_to_decimal_address(commands):
+            self.skipped = True
+            return commands
+        blocks = split_basic_blocks(commands)
+        block_of_label = {}
+        for index, block in enumerate(blocks):
+            for label in block.labels:
+                block_of_label[label] = index
+
+        reachable = [False] * len(blocks)
+        referenced_labels = set()
+        pending = [0]
+        while pending:
+            index = pending.pop()
+            if reachable[index]:
+                continue
+            reachable[index] = True
+            block = blocks[index]
+            for instruction in block.instructions:
+                if instruction[0] == "@" and \
+                        instruction[1:] in block_of_label:
+                    referenced_labels.add(instruction[1:])
+                    pending.append(block_of_label[instruction[1:]])
+            if block.falls_through() and index + 1 < len(blocks):
+                pending.append(index + 1)
+
+        output = []
+        for index, block in enumerate(blocks):
+            if not reachable[index]:
+                self.removed_instructions += len(block.instructions)
+                self.removed_labels += len(block.labels)
+                continue
+            for label in block.labels:
+                if label in referenced_labels:
+                    output.append("(" + label + ")")
+                else:
+                    self.removed_labels += 1
+            output.extend(block.instructions)
+        return output
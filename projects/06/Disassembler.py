@@ -0,0 +1,118 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import os
+import sys
+import typing
+from Code import COMP_WORDS, JUMP_WORDS
+from PackedHack import load_rom
+
+# The dest mnemonics in the order used by the book.
+DEST_MNEMONICS = ["", "M", "D", "MD", "A", "AM", "AD", "AMD"]
+JUMP_MNEMONICS = {word: mnemonic for mnemonic, word in JUMP_WORDS.items()}
+# Bits 15..6 of a C-instruction, mapped back to the comp mnemonic.
+COMP_MNEMONICS = {word >> 6: mnemonic for mnemonic, word in COMP_WORDS.items()}
+
+# C-instructions without a comp mnemonic are written as comments of their
+# bits.
+RAW_PREFIX = "// raw "
+
+_decode_table = None
+
+
+def decode_table() -> typing.List[typing.Optional[str]]:
+    """Builds (once) the table that maps each of the 65536 possible words to
+    its instruction, so decoding a word is a single list index.
+
+    Returns:
+        typing.List[typing.Optional[str]]: the instruction of every word, or
+        None for words that are not valid instructions.
+    """
+    global _decode_table
+    if _decode_table is None:
+        table = ["@" + str(word) for word in range(0x8000)]
+        table.extend([None] * 0x8000)
+        for comp_bits, comp in COMP_MNEMONICS.items():
+            base = comp_bits << 6
+            for dest_bits, dest in enumerate(DEST_MNEMONICS):
+                prefix = dest + "=" + comp if dest else comp
+                for jump_bits in range(8):
+                    jump = JUMP_MNEMONICS[jump_bits]
+                    table[base | (dest_bits << 3) | jump_bits] = \
+                        prefix + ";" + jump if jump else prefix
+        _decode_table = table
+    return _decode_table
+
+
+def disassemble(words: typing.Sequence[int],
+                labels: typing.Optional[typing.Dict[str, int]] = None) \
+        -> typing.List[str]:
+    """Disassembles a ROM image. Every word is decoded with one lookup in
+    decode_table. A-instructions that load the target of a jump get a label:
+    one of the given labels when it names the target, and a synthetic
+    L<address> label otherwise. Assembling the result gives back the same
+    words, unless a C-instruction has no comp mnemonic: the emulators run
+    its raw ALU bits, but it can only be written as a "// raw <bits>"
+    comment line, which assembles to nothing.
+
+    Args:
+        words (typing.Sequence[int]): the ROM words.
+        labels (typing.Dict[str, int]): optional labels and their ROM
+            addresses, e.g. ObjectFile.labels. Variables and predefined
+            symbols must not be included, as they are RAM addresses.
+
+    Returns:
+        typing.List[str]: the assembly lines.
+    """
+    table = decode_table()
+    instructions = [table[word] for word in words]
+    names = {}
+    for label, address in (labels or {}).items():
+        names.setdefault(address, label)
+
+    jump_loads = {}  # index of an A-instruction -> its jump target
+    last_load = None
+    for index, instruction in enumerate(instructions):
+        if instruction is None:
+            instructions[index] = RAW_PREFIX + format(words[index], "016b")
+            jumps = words[index] & 0b111
+            loads_a = words[index] & 0b100000
+        elif instruction[0] == "@":
+            last_load = index
+            continue
+        else:
+            jumps = ";" in instruction
+            loads_a = "A" in instruction.partition("=")[0] and \
+                "=" in instruction
+        if jumps and last_load is not None:
+            target = int(instructions[last_load][1:])
+            if target <= len(instructions):
+                jump_loads[last_load] = target
+        if loads_a:
+            last_load = None
+
+    target_labels = {target: names.get(target, "L" + str(target))
+                     for target in jump_loads.values()}
+    lines = []
+    for index, instruction in enumerate(instructions):
+        if index in target_labels:
+            lines.append("(" + target_labels[index] + ")")
+        if index in jump_loads:
+            lines.append("@" + target_labels[jump_loads[index]])
+        else:
+            lines.append(instruction)
+    if len(instructions) in target_labels:
+        lines.append("(" + target_labels[len(instructions)] + ")")
+    return lines
+
+
+if "__main__" == __name__:
+    # Disassembles a .hack file or a packed image to the standard output.
+    if not len(sys.argv) == 2:
+        sys.exit("Invalid usage, please use: Disassembler <input path>")
+    for line in disassemble(load_rom(os.path.abspath(sys.argv[1]))):
+        print(line)
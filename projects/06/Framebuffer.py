@@ -0,0 +1,167 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import argparse
+import os
+import struct
+import sys
+import typing
+import zlib
+from array import array
+from CPUEmulator import CPUEmulator, KEYBOARD_ADDRESS, SCREEN_ADDRESS, \
+    load_program
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+SCREEN_WIDTH = 512
+SCREEN_HEIGHT = 256
+ROW_BYTES = SCREEN_WIDTH // 8
+FRAME_FORMATS = ("png", "pbm")
+
+# Pixel i of a screen word is its bit i, so the little-endian bytes of a row,
+# each with its bits reversed, are the row packed most significant bit
+# first, with 1 for black, as PBM and 1-bit PNG images store it.
+BIT_REVERSE = bytes(int(format(value, "08b")[::-1], 2) for value in range(256))
+
+# A 1-bit PNG palette: 0 is white and 1 is black, like the Hack screen.
+PNG_PALETTE = b"\xff\xff\xff\x00\x00\x00"
+
+
+def _png_chunk(chunk_type: bytes, data: bytes) -> bytes:
+    """
+    Args:
+        chunk_type (bytes): the 4 letters type of the chunk.
+        data (bytes): its data.
+
+    Returns:
+        bytes: the chunk, with its length and CRC.
+    """
+    return struct.pack(">I", len(data)) + chunk_type + data + \
+        struct.pack(">I", zlib.crc32(chunk_type + data))
+
+
+class Framebuffer:
+    """
+    Renders the screen memory map of an emulator into packed rows of pixels.
+    Every update compares the screen to the one rendered last, and renders
+    again only the rows whose words were written with new values.
+    """
+
+    def __init__(self, emulator: CPUEmulator) -> None:
+        """
+        Args:
+            emulator (CPUEmulator): the emulator whose screen is rendered.
+        """
+        self.emulator = emulator
+        self.screen = bytes(2 * (KEYBOARD_ADDRESS - SCREEN_ADDRESS))
+        self.rows = [bytes(ROW_BYTES)] * SCREEN_HEIGHT
+        self.frames = 0
+        self.rendered_rows = 0
+
+    def update(self) -> typing.List[int]:
+        """Renders the rows that changed since the last update.
+
+        Returns:
+            typing.List[int]: the indices of the rows that changed.
+        """
+        screen = memoryview(self.emulator.ram)[
+            SCREEN_ADDRESS:KEYBOARD_ADDRESS].tobytes()
+        if sys.byteorder != "little":
+            words = array('h', screen)
+            words.byteswap()
+            screen = words.tobytes()
+        if screen == self.screen:
+            return []
+        dirty = []
+        previous = self.screen
+        for row in range(SCREEN_HEIGHT):
+            start = row * ROW_BYTES
+            end = start + ROW_BYTES
+            if screen[start:end] != previous[start:end]:
+                self.rows[row] = screen[start:end].translate(BIT_REVERSE)
+                dirty.append(row)
+        self.screen = screen
+        self.rendered_rows += len(dirty)
+        return dirty
+
+    def pixels(self) -> "numpy.ndarray":
+        """
+        Returns:
+            numpy.ndarray: the screen as a SCREEN_HEIGHT x SCREEN_WIDTH array
+            of uint8, with 1 for black.
+        """
+        if numpy is None:
+            raise Exception("Framebuffer.pixels requires numpy")
+        packed = numpy.frombuffer(b"".join(self.rows), dtype=numpy.uint8)
+        return numpy.unpackbits(packed.reshape(SCREEN_HEIGHT, ROW_BYTES),
+                                axis=1)
+
+    def write_pbm(self, output_file: typing.BinaryIO) -> None:
+        """Writes the screen as a binary PBM bitmap.
+
+        Args:
+            output_file (typing.BinaryIO): writes the bitmap to this file.
+        """
+        output_file.write(b"P4\n%d %d\n" % (SCREEN_WIDTH, SCREEN_HEIGHT))
+        output_file.write(b"".join(self.rows))
+
+    def write_png(self, output_file: typing.BinaryIO) -> None:
+        """Writes the screen as a 1-bit PNG image.
+
+        Args:
+            output_file (typing.BinaryIO): writes the image to this file.
+        """
+        header = struct.pack(">IIBBBBB", SCREEN_WIDTH, SCREEN_HEIGHT, 1, 3, 0,
+                             0, 0)
+        data = zlib.compress(b"".join(b"\0" + row for row in self.rows))
+        output_file.write(b"\x89PNG\r\n\x1a\n" + _png_chunk(b"IHDR", header) +
+                          _png_chunk(b"PLTE", PNG_PALETTE) +
+                          _png_chunk(b"IDAT", data) + _png_chunk(b"IEND", b""))
+
+    def export(self, path: str) -> None:
+        """Writes the screen to a .png or a .pbm file.
+
+        Args:
+            path (str): path of the file, whose extension picks the format.
+        """
+        with open(path, 'wb') as output_file:
+            if path.lower().endswith(".pbm"):
+                self.write_pbm(output_file)
+            else:
+                self.write_png(output_file)
+        self.frames += 1
+
+
+if "__main__" == __name__:
+    # Runs a program and exports a frame every --every instructions, whenever
+    # the screen changed.
+    argument_parser = argparse.ArgumentParser(prog="Framebuffer")
+    argument_parser.add_argument("input_path")
+    argument_parser.add_argument("output_directory")
+    argument_parser.add_argument(
+        "--steps", type=int, default=10 ** 7,
+        help="maximal number of instructions to execute")
+    argument_parser.add_argument(
+        "--every", type=int, default=10 ** 6, metavar="N",
+        help="check the screen every N instructions")
+    argument_parser.add_argument(
+        "--format", choices=FRAME_FORMATS, default="png")
+    arguments = argument_parser.parse_args()
+    program = CPUEmulator(load_program(os.path.abspath(arguments.input_path)))
+    framebuffer = Framebuffer(program)
+    os.makedirs(arguments.output_directory, exist_ok=True)
+    while program.cycles < arguments.steps and not program.halted:
+        program.run(min(arguments.every, arguments.steps - program.cycles))
+        if framebuffer.update():
+            framebuffer.export(os.path.join(
+                arguments.output_directory, "frame_%09d.%s" % (
+                    program.cycles, arguments.format)))
+    print("%d frames exported, %d rows rendered" % (
+        framebuffer.frames, framebuffer.rendered_rows))
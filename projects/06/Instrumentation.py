@@ -0,0 +1,101 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import contextlib
+import json
+import time
+import typing
+
+INSTRUMENTATION_EXTENSION = ".stats.json"
+
+
+class Instrumentation:
+    """
+    Collects measurements of one assembly run: the wall time and number of
+    items of every phase, in the order the phases first ran, and named
+    counters such as the number of commands of each type.
+    """
+
+    # False for NullInstrumentation, so loops can skip per-item counting.
+    enabled = True
+
+    def __init__(self) -> None:
+        """Creates an empty instrumentation object."""
+        self.phases = {}  # phase name -> [seconds, items]
+        self.counters = {}
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> typing.Iterator[None]:
+        """Times the code run inside a with block as the given phase. A phase
+        that runs more than once accumulates its time.
+
+        Args:
+            name (str): the phase name.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            measurement = self.phases.setdefault(name, [0.0, 0])
+            measurement[0] += time.perf_counter() - start
+
+    def add_items(self, name: str, items: int) -> None:
+        """Records how many items (lines, commands, words) a phase handled.
+
+        Args:
+            name (str): the phase name.
+            items (int): the number of items to add.
+        """
+        self.phases.setdefault(name, [0.0, 0])[1] += items
+
+    def count(self, name: str, amount: int = 1) -> None:
+        """Adds to a named counter.
+
+        Args:
+            name (str): the counter name.
+            amount (int): the amount to add.
+        """
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def to_dict(self) -> typing.Dict[str, typing.Any]:
+        """
+        Returns:
+            typing.Dict[str, typing.Any]: the measurements, with the total
+            time of all phases.
+        """
+        return {"phases": {name: {"seconds": seconds, "items": items}
+                           for name, (seconds, items) in self.phases.items()},
+                "total_seconds": sum(seconds
+                                     for seconds, _ in self.phases.values()),
+                "counters": dict(self.counters)}
+
+    def dump(self, output_file: typing.TextIO) -> None:
+        """Writes the measurements as JSON.
+
+        Args:
+            output_file (typing.TextIO): writes the JSON to this file.
+        """
+        json.dump(self.to_dict(), output_file, indent=2)
+        output_file.write("\n")
+
+
+class NullInstrumentation(Instrumentation):
+    """
+    Records nothing. Used when no instrumentation is requested, so that the
+    phases are neither timed nor counted.
+    """
+
+    enabled = False
+
+    def phase(self, name: str) -> typing.ContextManager[None]:
+        return contextlib.nullcontext()
+
+    def add_items(self, name: str, items: int) -> None:
+        pass
+
+    def count(self, name: str, amount: int = 1) -> None:
+        pass
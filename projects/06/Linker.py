@@ -0,0 +1,85 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import os
+import sys
+import typing
+from array import array
+from Code import Code
+from ObjectFile import ObjectFile
+from PackedHack import PACKED_EXTENSION, write_packed
+from SymbolTable import SymbolTable, VARIABLES_BASE_ADDRESS
+
+ROM_SIZE = 32768
+
+
+def link(objects: typing.Iterable[ObjectFile]) \
+        -> typing.Tuple[array, SymbolTable]:
+    """Links objects into one program. The objects are placed in ROM one
+    after the other, in the given order. Symbols defined as a label by any
+    object resolve to that label's final address, and all other symbols are
+    variables, allocated from address 16 in order of first use. Linking the
+    object of a whole program therefore gives exactly the words the
+    assembler gives for it.
+
+    Args:
+        objects (typing.Iterable[ObjectFile]): the objects to link.
+
+    Returns:
+        typing.Tuple[array, SymbolTable]: the program's words, as an
+        array('H'), and the symbol table with every final address.
+    """
+    objects = list(objects)
+    symbol_table = SymbolTable()
+    labels = {}
+    base = 0
+    for linked_object in objects:
+        for label, offset in linked_object.labels.items():
+            if label in labels:
+                raise Exception("label " + label + " is defined twice")
+            labels[label] = base + offset
+        base += len(linked_object.words)
+    if base > ROM_SIZE:
+        raise Exception("the linked program does not fit in ROM (%d words)"
+                        % base)
+    for label, address in labels.items():
+        symbol_table.add_entry(label, address)
+
+    code = Code()
+    words = array('H')
+    new_symbol_address = VARIABLES_BASE_ADDRESS
+    for linked_object in objects:
+        base = len(words)
+        words.extend(linked_object.words)
+        for index, symbol in linked_object.relocations:
+            if not symbol_table.contains(symbol):
+                symbol_table.add_entry(symbol, new_symbol_address)
+                new_symbol_address += 1
+            words[base + index] = code.encode_a(
+                symbol_table.get_address(symbol))
+    return words, symbol_table
+
+
+if "__main__" == __name__:
+    # Links the given object files into a .hack file, or into a packed image
+    # if the output path ends with the packed extension.
+    if len(sys.argv) < 3:
+        sys.exit("Invalid usage, please use: "
+                 "Linker <output path> <object path> [<object path> ...]")
+    output_path = os.path.abspath(sys.argv[1])
+    objects = []
+    for object_path in sys.argv[2:]:
+        with open(object_path, 'r') as object_file:
+            objects.append(ObjectFile.read(object_file))
+    words, _ = link(objects)
+    if os.path.splitext(output_path)[1].lower() == PACKED_EXTENSION:
+        with open(output_path, 'wb') as output_file:
+            write_packed(words, output_file)
+    else:
+        with open(output_path, 'w') as output_file:
+            for word in words:
+                output_file.write(Code.to_text(word) + "\n")
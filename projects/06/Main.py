@@ -5,65 +5,379 @@ was written by Aviv Yaish. It is an extension to the specifications given
 as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
 Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
 """
+import argparse
+import concurrent.futures
 import os
 import sys
 import typing
-from SymbolTable import SymbolTable
-from Parser import Parser
-from Code import Code
+from array import array
+from SymbolTable import SymbolTable, VARIABLES_BASE_ADDRESS
+from Parser import Parser, stream_commands
+from Code import Code, MAX_ADDRESS
+from AssemblyCache import AssemblyCache, DEFAULT_MAX_BYTES
+from PackedHack import PACKED_EXTENSION, write_packed
+from ObjectFile import OBJECT_EXTENSION, assemble_object
+from SourceMap import SOURCE_MAP_EXTENSION, SourceMap
+from Optimizer import PeepholeOptimizer
+from Instrumentation import INSTRUMENTATION_EXTENSION, Instrumentation, \
+    NullInstrumentation
+from ControlFlow import DeadCodeEliminator
+
+OUTPUT_EXTENSIONS = {"hack": ".hack", "packed": PACKED_EXTENSION,
+                     "object": OBJECT_EXTENSION}
 
 
 def assemble_file(
-        input_file: typing.TextIO, output_file: typing.TextIO) -> None:
+        input_file: typing.TextIO, output_file: typing.TextIO,
+        code: typing.Optional[Code] = None,
+        source_map: typing.Optional[SourceMap] = None,
+        instrumentation: typing.Optional[Instrumentation] = None) -> None:
     """Assembles a single file.
 
     Args:
         input_file (typing.TextIO): the file to assemble.
         output_file (typing.TextIO): writes all output to this file.
+        code (Code): encodes the instructions. Pass one to share its
+            instruction cache between files or to read its counters.
+        source_map (SourceMap): if given, every ROM address is added to it.
+        instrumentation (Instrumentation): if given, records the time of the
+            read, label pass, symbol resolution, encoding and write phases,
+            the number of commands of each type and the symbol table size.
     """
     # Your code goes here!
     # A good place to start is to initialize a new Parser object:
     # parser = Parser(input_file)
     # Note that you can write to output_file like so:
     # output_file.write("Hello world! \n")
+    if instrumentation is None:
+        instrumentation = NullInstrumentation()
     symbol_table = SymbolTable()
-    code = Code()
-    parser = Parser(input_file)
-    while True:
-        if parser.command_type() == "L_COMMAND":
-            symbol_table.add_entry(parser.symbol(), parser.cur_command_line)
-        if parser.has_more_commands():
-            parser.advance()
-        else:
-            break
+    if code is None:
+        code = Code()
+    with instrumentation.phase("read"):
+        parser = Parser(input_file)
+    instrumentation.add_items("read", len(parser.input_lines))
 
-    new_symbol_address = 16
-    parser.reset()
-    while True:
-        if parser.command_type() == "A_COMMAND":
-            symbol = parser.symbol()
-            if symbol.isdecimal():
-                symbol_address = int(symbol)
+    commands = 0
+    counting = instrumentation.enabled
+    with instrumentation.phase("label pass"):
+        while True:
+            command_type = parser.command_type()
+            if counting:
+                instrumentation.count(command_type)
+            commands += 1
+            if command_type == "L_COMMAND":
+                symbol_table.add_entry(parser.symbol(),
+                                       parser.cur_command_line)
+            if parser.has_more_commands():
+                parser.advance()
             else:
-                if symbol_table.contains(symbol):
-                    symbol_address = symbol_table.get_address(symbol)
+                break
+    instrumentation.add_items("label pass", commands)
+
+    # Resolved A-commands become their address, and every other instruction
+    # stays as text for the encoding phase.
+    instructions = []
+    new_symbol_address = VARIABLES_BASE_ADDRESS
+    label = ""
+    comment = ""
+    scanned_line = 0
+    with instrumentation.phase("symbol resolution"):
+        parser.reset()
+        while True:
+            if source_map is not None:
+                for line in parser.input_lines[scanned_line:parser.cur_line]:
+                    line = line.strip()
+                    if line.startswith("//"):
+                        comment = line[2:].strip()
+                scanned_line = parser.cur_line + 1
+            if parser.command_type() == "L_COMMAND":
+                label = parser.symbol()
+            elif parser.command_type() == "A_COMMAND":
+                symbol = parser.symbol()
+                if symbol.isdecimal():
+                    if int(symbol) > MAX_ADDRESS:
+                        raise Exception(
+                            "line %d: %s does not fit in an A-instruction "
+                            "(0-%d)" % (parser.cur_line + 1,
+                                        parser.input_lines[
+                                            parser.cur_line].strip(),
+                                        MAX_ADDRESS))
+                    instructions.append(parser.cur_command)
                 else:
-                    symbol_address = new_symbol_address
-                    symbol_table.add_entry(symbol, new_symbol_address)
-                    new_symbol_address += 1
-            output_file.write(bin(symbol_address)[2:].zfill(16) + "\n")
-        elif parser.command_type() == "C_COMMAND":
-            dest_bin = code.dest(parser.dest())
-            comp_bin = code.comp(parser.comp())
-            jump_bin = code.jump(parser.jump())
-            output_file.write(comp_bin + dest_bin + jump_bin + "\n")
-
-        if parser.has_more_commands():
-            parser.advance()
+                    if symbol_table.contains(symbol):
+                        symbol_address = symbol_table.get_address(symbol)
+                    else:
+                        symbol_address = new_symbol_address
+                        symbol_table.add_entry(symbol, new_symbol_address)
+                        new_symbol_address += 1
+                    instructions.append(symbol_address)
+                if source_map is not None:
+                    source_map.add(parser.cur_line + 1, label, comment)
+            elif parser.command_type() == "C_COMMAND":
+                instructions.append(parser.cur_command)
+                if source_map is not None:
+                    source_map.add(parser.cur_line + 1, label, comment)
+
+            if parser.has_more_commands():
+                parser.advance()
+            else:
+                break
+    instrumentation.add_items("symbol resolution", len(instructions))
+
+    with instrumentation.phase("encoding"):
+        words = array('H', [
+            code.encode_a(instruction) if type(instruction) is int
+            else code.encode(instruction) for instruction in instructions])
+    instrumentation.add_items("encoding", len(words))
+
+    with instrumentation.phase("write"):
+        for word in words:
+            output_file.write(code.to_text(word) + "\n")
+    instrumentation.add_items("write", len(words))
+    instrumentation.count("symbols", len(symbol_table.symbol_table))
+    instrumentation.count("variables",
+                          new_symbol_address - VARIABLES_BASE_ADDRESS)
+
+
+def assemble_words(
+        input_file: typing.Iterable[str],
+        code: typing.Optional[Code] = None,
+        optimizers: typing.Sequence[typing.Any] = (),
+        symbol_table: typing.Optional[SymbolTable] = None) -> array:
+    """Assembles a single file in one streaming pass over its lines.
+    Labels are recorded as they are met, and A-commands referring to symbols
+    that are not yet known are left as holes and backpatched once the input
+    is exhausted. Variables are then allocated in order of first use, so the
+    result is identical to the one of assemble_file. Only the encoded
+    16-bit words are kept in memory, never the source text.
+
+    Args:
+        input_file (typing.Iterable[str]): the file to assemble, or any
+            iterable of its lines.
+        code (Code): encodes the instructions, see assemble_file.
+        optimizers (typing.Sequence[typing.Any]): passes such as
+            PeepholeOptimizer or DeadCodeEliminator, whose optimize method
+            rewrites the commands before they are encoded, in order.
+        symbol_table (SymbolTable): the table to resolve symbols with. When
+            given, it holds every label and variable afterwards.
+
+    Returns:
+        array: the encoded words, as an array('H').
+    """
+    if symbol_table is None:
+        symbol_table = SymbolTable()
+    if code is None:
+        code = Code()
+    commands = stream_commands(input_file)
+    for optimizer in optimizers:
+        commands = optimizer.optimize(commands)
+    words = array('H')
+    unresolved = []  # (index in words, symbol) of forward references
+    for command in commands:
+        if command[0] == "(":
+            symbol_table.add_entry(command[1:-1], len(words))
+        elif command[0] == "@":
+            symbol = command[1:]
+            if symbol.isdecimal():
+                words.append(code.encode(command))
+            elif symbol_table.contains(symbol):
+                words.append(code.encode_a(symbol_table.get_address(symbol)))
+            else:
+                unresolved.append((len(words), symbol))
+                words.append(0)
         else:
-            break
+            words.append(code.encode(command))
+
+    new_symbol_address = VARIABLES_BASE_ADDRESS
+    for index, symbol in unresolved:
+        if not symbol_table.contains(symbol):
+            symbol_table.add_entry(symbol, new_symbol_address)
+            new_symbol_address += 1
+        words[index] = code.encode_a(symbol_table.get_address(symbol))
+    return words
 
 
+def assemble(
+        source: typing.Union[str, typing.Iterable[str]],
+        code: typing.Optional[Code] = None,
+        optimizers: typing.Sequence[typing.Any] = ()) \
+        -> typing.Tuple[array, SymbolTable]:
+    """Assembles a program held in memory, without any file I/O. This is the
+    entry point for using the assembler as a library: pass the same Code to
+    many calls to share its instruction cache.
+
+    Args:
+        source (typing.Union[str, typing.Iterable[str]]): the program, as
+            one string or as an iterable of lines.
+        code (Code): encodes the instructions, see assemble_file.
+        optimizers (typing.Sequence[typing.Any]): see assemble_words.
+
+    Returns:
+        typing.Tuple[array, SymbolTable]: the encoded words, as an
+        array('H'), and the symbol table with every label and variable.
+    """
+    if isinstance(source, str):
+        source = source.splitlines()
+    symbol_table = SymbolTable()
+    words = assemble_words(source, code, optimizers, symbol_table)
+    return words, symbol_table
+
+
+def assemble_file_single_pass(
+        input_file: typing.TextIO, output_file: typing.TextIO,
+        code: typing.Optional[Code] = None,
+        optimizers: typing.Sequence[typing.Any] = ()) -> None:
+    """Assembles a single file with assemble_words.
+
+    Args:
+        input_file (typing.TextIO): the file to assemble.
+        output_file (typing.TextIO): writes all output to this file.
+        code (Code): encodes the instructions, see assemble_file.
+        optimizers (typing.Sequence[typing.Any]): see assemble_words.
+    """
+    if code is None:
+        code = Code()
+    for word in assemble_words(input_file, code, optimizers):
+        output_file.write(code.to_text(word) + "\n")
+
+
+def assemble_file_packed(
+        input_file: typing.TextIO, output_file: typing.BinaryIO,
+        code: typing.Optional[Code] = None,
+        optimizers: typing.Sequence[typing.Any] = ()) -> None:
+    """Assembles a single file with assemble_words into the packed binary
+    format of PackedHack, without ever rendering the words as text.
+
+    Args:
+        input_file (typing.TextIO): the file to assemble.
+        output_file (typing.BinaryIO): writes all output to this file.
+        code (Code): encodes the instructions, see assemble_file.
+        optimizers (typing.Sequence[typing.Any]): see assemble_words.
+    """
+    write_packed(assemble_words(input_file, code, optimizers), output_file)
+
+
+def output_path_of(input_path: str, output_format: str = "hack") -> str:
+    """
+    Args:
+        input_path (str): path of an .asm file.
+        output_format (str): a key of OUTPUT_EXTENSIONS.
+
+    Returns:
+        str: the path of the file's output.
+    """
+    filename, extension = os.path.splitext(input_path)
+    return filename + OUTPUT_EXTENSIONS[output_format]
+
+
+def assemble_path(input_path: str, single_pass: bool = False,
+                  output_format: str = "hack",
+                  write_source_map: bool = False, optimize: bool = False,
+                  eliminate_dead_code: bool = False,
+                  instrument: bool = False,
+                  cache_stats: bool = False) -> typing.List[str]:
+    """Assembles the .asm file at the given path into a .hack file (or a
+    packed image, or an object file) next to it.
+
+    Args:
+        input_path (str): path of the .asm file.
+        single_pass (bool): use assemble_file_single_pass.
+        output_format (str): "hack", "packed" or "object".
+        write_source_map (bool): also write a source map next to the .hack
+            file. Only supported by the two-pass assemble_file.
+        optimize (bool): run the PeepholeOptimizer, which implies the
+            single-pass assembler.
+        eliminate_dead_code (bool): run the DeadCodeEliminator before, which
+            also implies the single-pass assembler. Not for object files,
+            as their code may be reached from other objects.
+        instrument (bool): also write the Instrumentation of the run as JSON
+            next to the .hack file. Only supported by assemble_file.
+        cache_stats (bool): report the instruction cache counters.
+
+    Returns:
+        typing.List[str]: the lines to report about the file.
+    """
+    code = Code()
+    optimizers = []
+    if eliminate_dead_code:
+        optimizers.append(DeadCodeEliminator())
+    if optimize:
+        optimizers.append(PeepholeOptimizer())
+    output_path = output_path_of(input_path, output_format)
+    if output_format == "packed":
+        with open(input_path, 'r') as input_file, \
+                open(output_path, 'wb') as output_file:
+            assemble_file_packed(input_file, output_file, code, optimizers)
+    elif output_format == "object":
+        with open(input_path, 'r') as input_file, \
+                open(output_path, 'w') as output_file:
+            assemble_object(input_file, code, optimizers).write(output_file)
+    else:
+        with open(input_path, 'r') as input_file, \
+                open(output_path, 'w') as output_file:
+            if single_pass or optimizers:
+                assemble_file_single_pass(
+                    input_file, output_file, code, optimizers)
+            else:
+                source_map = None
+                if write_source_map:
+                    source_map = SourceMap(os.path.basename(input_path))
+                instrumentation = Instrumentation() if instrument else None
+                assemble_file(input_file, output_file, code, source_map,
+                              instrumentation)
+                if source_map is not None:
+                    with open(os.path.splitext(input_path)[0] +
+                              SOURCE_MAP_EXTENSION, 'w') as source_map_file:
+                        source_map.write(source_map_file)
+                if instrument:
+                    with open(os.path.splitext(input_path)[0] +
+                              INSTRUMENTATION_EXTENSION, 'w') as stats_file:
+                        instrumentation.dump(stats_file)
+    report = []
+    if cache_stats:
+        report.append("%s: %d hits, %d misses (%.1f%% hit rate)" % (
+            os.path.basename(input_path), code.cache_hits, code.cache_misses,
+            100 * code.cache_hit_rate()))
+    for optimizer in optimizers:
+        report.append(os.path.basename(input_path) + ": " +
+                      optimizer.report())
+    return report
+
+
+def _assemble_path_job(arguments: typing.Dict[str, typing.Any]) \
+        -> typing.Tuple[typing.List[str], typing.Optional[str]]:
+    """Runs assemble_path in a worker process. Errors are returned instead of
+    raised, so the parent reports them in file order.
+
+    Args:
+        arguments (typing.Dict[str, typing.Any]): keyword arguments of
+            assemble_path.
+
+    Returns:
+        typing.Tuple[typing.List[str], typing.Optional[str]]: the result of
+        assemble_path and None, or [] and an error message.
+    """
+    try:
+        return assemble_path(**arguments), None
+    except Exception as error:
+        return [], "%s: %s: %s" % (
+            os.path.basename(arguments["input_path"]),
+            type(error).__name__, error)
+
+
+def job_count(text: str) -> int:
+    """
+    Args:
+        text (str): the value of --jobs.
+
+    Returns:
+        int: the number of processes, 0 for one per CPU.
+    """
+    count = int(text)
+    if count < 0:
+        raise argparse.ArgumentTypeError("must be 0 or more, not %d" % count)
+    return count
 
 
 if "__main__" == __name__:
@@ -72,20 +386,115 @@ if "__main__" == __name__:
     # Both are closed automatically when the code finishes running.
     # If the output file does not exist, it is created automatically in the
     # correct path, using the correct filename.
-    if not len(sys.argv) == 2:
-        sys.exit("Invalid usage, please use: Assembler <input path>")
-    argument_path = os.path.abspath(sys.argv[1])
+    argument_parser = argparse.ArgumentParser(prog="Assembler")
+    argument_parser.add_argument("input_path")
+    argument_parser.add_argument(
+        "--single-pass", action="store_true",
+        help="assemble in one streaming pass")
+    argument_parser.add_argument(
+        "--cache-stats", action="store_true",
+        help="print the instruction cache hit rate of every file")
+    output_formats = argument_parser.add_mutually_exclusive_group()
+    output_formats.add_argument(
+        "--packed", action="store_const", dest="output_format",
+        const="packed", default="hack",
+        help="write packed " + PACKED_EXTENSION + " images instead of .hack")
+    output_formats.add_argument(
+        "--object", action="store_const", dest="output_format",
+        const="object",
+        help="write relocatable " + OBJECT_EXTENSION + " objects for Linker")
+    argument_parser.add_argument(
+        "--optimize", action="store_true",
+        help="run the peephole optimizer before encoding")
+    argument_parser.add_argument(
+        "--eliminate-dead-code", action="store_true",
+        help="drop code unreachable from address 0 before encoding")
+    argument_parser.add_argument(
+        "--source-map", action="store_true",
+        help="also write a " + SOURCE_MAP_EXTENSION + " source map of every "
+             "file")
+    argument_parser.add_argument(
+        "--instrument", action="store_true",
+        help="also write the phase timings and counts of every file to "
+             "<name>" + INSTRUMENTATION_EXTENSION)
+    argument_parser.add_argument(
+        "--cache-dir", metavar="DIR",
+        help="reuse the outputs of unchanged files from this directory")
+    argument_parser.add_argument(
+        "--cache-max-bytes", type=int, default=DEFAULT_MAX_BYTES,
+        metavar="BYTES", help="evict old cache entries beyond this size")
+    argument_parser.add_argument(
+        "--jobs", type=job_count, default=1, metavar="N",
+        help="assemble N files at a time in a process pool (0 for one per "
+             "CPU)")
+    arguments = argument_parser.parse_args()
+    for option, enabled in (("--source-map", arguments.source_map),
+                            ("--instrument", arguments.instrument)):
+        if enabled and (
+                arguments.single_pass or arguments.optimize or
+                arguments.eliminate_dead_code or
+                arguments.output_format != "hack" or
+                arguments.cache_dir is not None):
+            argument_parser.error(option + " only works with the default "
+                                  "two-pass .hack output and without a cache")
+    if arguments.eliminate_dead_code and arguments.output_format == "object":
+        argument_parser.error("--eliminate-dead-code needs whole programs, "
+                              "not objects")
+    argument_path = os.path.abspath(arguments.input_path)
     if os.path.isdir(argument_path):
         files_to_assemble = [
             os.path.join(argument_path, filename)
-            for filename in os.listdir(argument_path)]
+            for filename in sorted(os.listdir(argument_path))]
     else:
         files_to_assemble = [argument_path]
-    for input_path in files_to_assemble:
-        filename, extension = os.path.splitext(input_path)
-        if extension.lower() != ".asm":
+    jobs = [dict(input_path=input_path, single_pass=arguments.single_pass,
+                 output_format=arguments.output_format,
+                 write_source_map=arguments.source_map,
+                 optimize=arguments.optimize,
+                 eliminate_dead_code=arguments.eliminate_dead_code,
+                 instrument=arguments.instrument,
+                 cache_stats=arguments.cache_stats)
+            for input_path in files_to_assemble
+            if os.path.splitext(input_path)[1].lower() == ".asm"]
+    cache = None
+    cache_keys = {}
+    if arguments.cache_dir is not None:
+        # Cache lookups and stores all happen here, so the workers never
+        # race on the cache directory.
+        cache = AssemblyCache(arguments.cache_dir, arguments.cache_max_bytes)
+        output_extension = OUTPUT_EXTENSIONS[arguments.output_format]
+        options = " ".join(
+            option for option, enabled in (
+                ("eliminate-dead-code", arguments.eliminate_dead_code),
+                ("optimize", arguments.optimize)) if enabled)
+        missed_jobs = []
+        for job in jobs:
+            key = cache.key(job["input_path"], output_extension, options)
+            output_path = output_path_of(job["input_path"],
+                                         arguments.output_format)
+            if not cache.fetch(key, output_path):
+                cache_keys[job["input_path"]] = key
+                missed_jobs.append(job)
+        jobs = missed_jobs
+    if arguments.jobs == 1:
+        results = [_assemble_path_job(job) for job in jobs]
+    else:
+        with concurrent.futures.ProcessPoolExecutor(
+                max_workers=arguments.jobs or None) as executor:
+            results = list(executor.map(_assemble_path_job, jobs))
+    failed = False
+    for job, (report, error) in zip(jobs, results):
+        if error is not None:
+            print("FAIL " + error, file=sys.stderr)
+            failed = True
             continue
-        output_path = filename + ".hack"
-        with open(input_path, 'r') as input_file, \
-                open(output_path, 'w') as output_file:
-            assemble_file(input_file, output_file)
+        if cache is not None:
+            cache.store(cache_keys[job["input_path"]],
+                        output_path_of(job["input_path"],
+                                       arguments.output_format))
+        for line in report:
+            print(line)
+    if cache is not None:
+        print(cache.report())
+    if failed:
+        sys.exit(1)
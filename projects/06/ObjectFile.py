@@ -0,0 +1,117 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import json
+import typing
+from array import array
+from Code import Code
+from Parser import stream_commands
+from SymbolTable import SymbolTable
+
+OBJECT_EXTENSION = ".hobj"
+OBJECT_FORMAT = "hack-object"
+OBJECT_VERSION = 1
+
+
+class ObjectFile:
+    """
+    A relocatable piece of a Hack program: its encoded words, where every
+    A-instruction referring to a label or a variable is left as 0 and listed
+    in a relocation table, together with the labels it defines, relative to
+    its first instruction. The Linker assigns the final addresses.
+    """
+
+    def __init__(self, words: array, labels: typing.Dict[str, int],
+                 relocations: typing.List[typing.Tuple[int, str]]) -> None:
+        """
+        Args:
+            words (array): the encoded words, as an array('H').
+            labels (typing.Dict[str, int]): the labels defined in the object
+                and their addresses, relative to the object's start.
+            relocations (typing.List[typing.Tuple[int, str]]): (index in
+                words, symbol) for every A-instruction to patch, in order.
+        """
+        self.words = words
+        self.labels = labels
+        self.relocations = relocations
+
+    def write(self, output_file: typing.TextIO) -> None:
+        """Writes the object as JSON.
+
+        Args:
+            output_file (typing.TextIO): writes the object to this file.
+        """
+        json.dump({"format": OBJECT_FORMAT, "version": OBJECT_VERSION,
+                   "words": self.words.tolist(), "labels": self.labels,
+                   "relocations": self.relocations},
+                  output_file, separators=(",", ":"))
+
+    @staticmethod
+    def read(input_file: typing.TextIO) -> "ObjectFile":
+        """Reads an object written by write().
+
+        Args:
+            input_file (typing.TextIO): the object file.
+
+        Returns:
+            ObjectFile: the object.
+        """
+        content = json.load(input_file)
+        if content.get("format") != OBJECT_FORMAT or \
+                content.get("version") != OBJECT_VERSION:
+            raise Exception(getattr(input_file, "name", "input") +
+                            " is not a Hack object file")
+        return ObjectFile(array('H', content["words"]), content["labels"],
+                          [(index, symbol)
+                           for index, symbol in content["relocations"]])
+
+
+def assemble_object(input_file: typing.Iterable[str],
+                    code: typing.Optional[Code] = None,
+                    optimizers: typing.Sequence[typing.Any] = ()) \
+        -> ObjectFile:
+    """Assembles a single file into a relocatable object, in one streaming
+    pass. Decimal constants and predefined symbols are resolved right away,
+    every other symbol is left to the linker.
+
+    Args:
+        input_file (typing.Iterable[str]): the file to assemble, or any
+            iterable of its lines.
+        code (Code): encodes the instructions.
+        optimizers (typing.Sequence[typing.Any]): passes that rewrite the
+            commands before they are encoded, see Main.assemble_words.
+
+    Returns:
+        ObjectFile: the assembled object.
+    """
+    predefined = SymbolTable()
+    if code is None:
+        code = Code()
+    words = array('H')
+    labels = {}
+    relocations = []
+    commands = stream_commands(input_file)
+    for optimizer in optimizers:
+        commands = optimizer.optimize(commands)
+    for command in commands:
+        if command[0] == "(":
+            label = command[1:-1]
+            if label in labels:
+                raise Exception("label " + label + " is defined twice")
+            labels[label] = len(words)
+        elif command[0] == "@":
+            symbol = command[1:]
+            if symbol.isdecimal():
+                words.append(code.encode(command))
+            elif predefined.contains(symbol):
+                words.append(code.encode_a(predefined.get_address(symbol)))
+            else:
+                relocations.append((len(words), symbol))
+                words.append(0)
+        else:
+            words.append(code.encode(command))
+    return ObjectFile(words, labels, relocations)
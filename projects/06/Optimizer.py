@@ -0,0 +1,150 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import typing
+from Parser import split_c_command
+
+# How far back a dead D write is looked for.
+DEAD_WRITE_WINDOW = 8
+
+# Pairs of C-commands that undo each other when they follow one another with
+# the same A.
+CANCELLING_PAIRS = {("M=M+1", "M=M-1"), ("M=M-1", "M=M+1"),
+                    ("D=D+1", "D=D-1"), ("D=D-1", "D=D+1"),
+                    ("A=A+1", "A=A-1"), ("A=A-1", "A=A+1")}
+
+
+def jumps_to_decimal_address(commands: typing.List[str]) -> bool:
+    """Removing instructions moves the ones after them, which breaks programs
+    that jump to decimal addresses (like RectL.asm).
+
+    Args:
+        commands (typing.List[str]): cleaned commands.
+
+    Returns:
+        bool: True if a jump in the commands uses an A that was loaded with a
+        decimal constant.
+    """
+    a_is_decimal = False
+    for command in commands:
+        if command[0] == "@":
+            a_is_decimal = command[1:].isdecimal()
+        elif command[0] == "(":
+            a_is_decimal = False
+        elif ";" in command and a_is_decimal:
+            return True
+    return False
+
+
+class PeepholeOptimizer:
+    """
+    Rewrites a stream of cleaned assembly commands before it is encoded,
+    removing:
+    - A-loads of the value A already holds,
+    - writes to D that are overwritten before being read,
+    - jumps (and their A-loads) to the label right after them,
+    - increments that are directly undone, like the M=M+1 of a push that is
+      followed by the M=M-1 of a pop.
+    Every label is treated as a point where A and D are unknown, so only
+    straight-line code is rewritten. Programs that jump to decimal
+    addresses are left untouched. The other assumptions made are that jump targets
+    come from labels and that code right after a label never reads the A
+    it was jumped to with, which hold for VMtranslator output and for
+    hand-written code that jumps with @LABEL;0;JMP.
+    """
+
+    def __init__(self) -> None:
+        """Creates an optimizer with zeroed counters."""
+        self.redundant_loads = 0
+        self.dead_writes = 0
+        self.jumps_to_next = 0
+        self.cancelled_pairs = 0
+        self.skipped = False
+
+    def saved(self) -> int:
+        """
+        Returns:
+            int: the number of instructions removed so far.
+        """
+        return self.redundant_loads + self.dead_writes + \
+            2 * self.jumps_to_next + 2 * self.cancelled_pairs
+
+    def report(self) -> str:
+        """
+        Returns:
+            str: a line summarizing the instructions removed by each rule.
+        """
+        if self.skipped:
+            return "not optimized, the program jumps to decimal addresses"
+        return "%d instructions saved (%d redundant loads, %d dead D " \
+               "writes, %d jumps to next, %d cancelled pairs)" % (
+                   self.saved(), self.redundant_loads, self.dead_writes,
+                   self.jumps_to_next, self.cancelled_pairs)
+
+    def optimize(self, commands: typing.Iterable[str]) -> typing.List[str]:
+        """
+        Args:
+            commands (typing.Iterable[str]): cleaned commands, as yielded by
+                Parser.stream_commands.
+
+        Returns:
+            typing.List[str]: the optimized commands.
+        """
+        commands = list(commands)
+        if jumps_to_decimal_address(commands):
+            self.skipped = True
+            return commands
+        output = []
+        a_value = None  # the @-command A is known to hold, if any
+        for command in commands:
+            if command[0] == "(":
+                if len(output) >= 2 and output[-2] == "@" + command[1:-1] \
+                        and output[-1][0] != "@" and "=" not in output[-1] \
+                        and ";" in output[-1]:
+                    del output[-2:]
+                    self.jumps_to_next += 1
+                output.append(command)
+                a_value = None
+            elif command[0] == "@":
+                if command == a_value:
+                    self.redundant_loads += 1
+                else:
+                    output.append(command)
+                    a_value = command
+            else:
+                if output and (output[-1], command) in CANCELLING_PAIRS:
+                    output.pop()
+                    self.cancelled_pairs += 1
+                    continue
+                dest, comp, jump = split_c_command(command)
+                if "D" in dest and "D" not in comp and not jump:
+                    self._remove_dead_write(output)
+                output.append(command)
+                if "A" in dest:
+                    a_value = None
+        return output
+
+    def _remove_dead_write(self, output: typing.List[str]) -> None:
+        """Removes the last write to D from the end of output, if D is not
+        read between it and the write that is about to be appended.
+        """
+        for index in range(len(output) - 1,
+                           max(len(output) - DEAD_WRITE_WINDOW, 0) - 1, -1):
+            command = output[index]
+            if command[0] == "(":
+                return
+            if command[0] == "@":
+                continue
+            dest, comp, jump = split_c_command(command)
+            if "D" in comp or jump:
+                return
+            if dest == "D":
+                del output[index]
+                self.dead_writes += 1
+                return
+            if "D" in dest:
+                return
@@ -0,0 +1,81 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import mmap
+import struct
+import sys
+import typing
+from array import array
+
+# A packed ROM image is a 12 bytes header followed by the instruction words,
+# each stored as a little-endian unsigned 16-bit integer.
+PACKED_EXTENSION = ".hackb"
+MAGIC = b"HACK"
+VERSION = 1
+HEADER = struct.Struct("<4sHHI")  # magic, version, entry point, word count
+
+
+def write_packed(words: typing.Iterable[int], output_file: typing.BinaryIO,
+                 entry_point: int = 0) -> None:
+    """Writes a packed ROM image.
+
+    Args:
+        words (typing.Iterable[int]): the 16-bit instruction words.
+        output_file (typing.BinaryIO): writes the image to this file.
+        entry_point (int): the ROM address execution starts from.
+    """
+    if not isinstance(words, array) or words.typecode != 'H' or \
+            sys.byteorder != "little":
+        words = array('H', words)
+        if sys.byteorder != "little":
+            words.byteswap()
+    output_file.write(HEADER.pack(MAGIC, VERSION, entry_point, len(words)))
+    output_file.write(words)
+
+
+def load_packed(path: str) -> typing.Tuple[int, typing.Sequence[int]]:
+    """Loads a packed ROM image by memory-mapping it. On little-endian
+    machines the words are not copied: they are a read-only memoryview of
+    the mapping, which stays alive for as long as the view does.
+
+    Args:
+        path (str): path of the image.
+
+    Returns:
+        typing.Tuple[int, typing.Sequence[int]]: the entry point, and the
+        words as a memoryview (or an array('H') on big-endian machines).
+    """
+    with open(path, 'rb') as packed_file:
+        image = mmap.mmap(packed_file.fileno(), 0, access=mmap.ACCESS_READ)
+    if len(image) < HEADER.size:
+        raise Exception(path + " is not a packed Hack image")
+    magic, version, entry_point, word_count = HEADER.unpack_from(image)
+    end = HEADER.size + 2 * word_count
+    if magic != MAGIC or version != VERSION or len(image) < end:
+        raise Exception(path + " is not a packed Hack image")
+    data = memoryview(image)[HEADER.size:end]
+    if sys.byteorder == "little":
+        return entry_point, data.cast('H')
+    words = array('H', data.tobytes())
+    words.byteswap()
+    return entry_point, words
+
+
+def load_rom(path: str) -> typing.Sequence[int]:
+    """Loads the words of a ROM image, either packed or a text .hack file.
+
+    Args:
+        path (str): path of the image.
+
+    Returns:
+        typing.Sequence[int]: the 16-bit words.
+    """
+    if path.lower().endswith(PACKED_EXTENSION):
+        return load_packed(path)[1]
+    with open(path, 'r') as hack_file:
+        return array('H', [int(line, 2) for line in hack_file
+                           if line.strip()])
@@ -6,7 +6,52 @@ as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
 Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
 """
 import typing
-import re
+
+
+def clean_line(line: str) -> str:
+    """Removes the comment and all white space from a single source line.
+
+    Args:
+        line (str): a raw line of assembly source.
+
+    Returns:
+        str: the command written on the line, or "" if there is none.
+    """
+    return "".join(line.split("//", 1)[0].split())
+
+
+def stream_commands(input_file: typing.Iterable[str]) -> typing.Iterator[str]:
+    """Lazily reads the input line by line and yields only the commands,
+    without comments and white space. Unlike Parser, the whole input is never
+    held in memory.
+
+    Args:
+        input_file (typing.Iterable[str]): input file, or any iterable of lines.
+
+    Returns:
+        typing.Iterator[str]: the cleaned commands, in order.
+    """
+    for line in input_file:
+        command = clean_line(line)
+        if command:
+            yield command
+
+
+def split_c_command(command: str) -> typing.Tuple[str, str, str]:
+    """Splits a cleaned C-command into its fields.
+
+    Args:
+        command (str): a C-command of the form dest=comp;jump.
+
+    Returns:
+        typing.Tuple[str, str, str]: the dest, comp and jump mnemonics, where
+        missing fields are "".
+    """
+    dest, equals, comp_jump = command.partition("=")
+    if not equals:
+        dest, comp_jump = "", command
+    comp, _, jump = comp_jump.partition(";")
+    return dest, comp, jump
 
 
 class Parser:
@@ -31,12 +76,11 @@ class Parser:
         self.cur_command_line = 0
 
         while True:
-            self.cur_command = re.sub(r'\s+', '', self.input_lines[self.cur_line])
-            if self.cur_command == '' or self.cur_command[0] == "/":
+            self.cur_command = clean_line(self.input_lines[self.cur_line])
+            if self.cur_command == '':
                 if self.has_more_commands():
                     self.cur_line += 1
             else:
-                self.cur_command = self.cur_command.split('//')[0]
                 self.last_L_command = True if self.command_type() == "L_COMMAND" else False
                 break
 
@@ -45,13 +89,11 @@ class Parser:
         self.cur_command_line = 0
 
         while True:
-            self.cur_command = re.sub(r'\s+', '',
-                                      self.input_lines[self.cur_line])
-            if self.cur_command == '' or self.cur_command[0] == "/":
+            self.cur_command = clean_line(self.input_lines[self.cur_line])
+            if self.cur_command == '':
                 if self.has_more_commands():
                     self.cur_line += 1
             else:
-                self.cur_command = self.cur_command.split('//')[0]
                 self.last_L_command = True if self.command_type() == "L_COMMAND" else False
                 break
 
@@ -70,9 +112,8 @@ class Parser:
         """
         while self.has_more_commands():
             self.cur_line += 1
-            self.cur_command = re.sub(r'\s+', '', self.input_lines[self.cur_line])
-            if self.cur_command != '' and self.cur_command[0] != "/":
-                self.cur_command = self.cur_command.split('//')[0]
+            self.cur_command = clean_line(self.input_lines[self.cur_line])
+            if self.cur_command != '':
                 if not self.last_L_command:
                     self.cur_command_line += 1
                 self.last_L_command = True if self.command_type() == "L_COMMAND" else False
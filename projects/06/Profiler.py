@@ -0,0 +1,263 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import argparse
+import os
+import re
+import typing
+from BlockCompiler import BlockEmulator
+from CPUEmulator import ROM_SIZE, load_program
+from Parser import stream_commands
+
+# Cycles spent before the first function, like the bootstrap code.
+ROOT = "(start)"
+
+# Return labels, as written by write_call ("return_") and by the book's
+# translator ("RET_ADDRESS_").
+RETURN_LABEL_PREFIXES = ("return_", "RET_ADDRESS_")
+
+# The labels write_function puts after (f..n) and at the end of (f.n) the
+# prologue of a function f.
+_prologue_label = re.compile(r"^(.+?)\.\.?\d+$")
+
+
+def scan_labels(commands: typing.Iterable[str]) -> typing.Dict[str, int]:
+    """
+    Args:
+        commands (typing.Iterable[str]): cleaned assembly commands.
+
+    Returns:
+        typing.Dict[str, int]: the ROM address of every label.
+    """
+    labels = {}
+    address = 0
+    for command in commands:
+        if command[0] == "(":
+            labels[command[1:-1]] = address
+        else:
+            address += 1
+    return labels
+
+
+def classify_labels(labels: typing.Dict[str, int]) \
+        -> typing.Tuple[typing.Dict[int, str], typing.Set[int], bool]:
+    """Finds the functions of VM code. A function f written by write_function
+    has an (f.n) label after its prologue, and the calls written by
+    write_call return to (return_...) labels. For code with no such
+    functions, every label that is not a return label and not local to a
+    function (f$label) is taken as a function, and calls are not tracked.
+
+    Args:
+        labels (typing.Dict[str, int]): the ROM address of every label.
+
+    Returns:
+        typing.Tuple[typing.Dict[int, str], typing.Set[int], bool]: the
+        functions by their entry addresses, the return addresses, and
+        whether calls can be tracked.
+    """
+    functions = {}
+    for label in labels:
+        match = _prologue_label.match(label)
+        if match and match.group(1) in labels and \
+                not match.group(1).startswith(RETURN_LABEL_PREFIXES):
+            functions[labels[match.group(1)]] = match.group(1)
+    tracks_calls = bool(functions)
+    if not tracks_calls:
+        for label, address in labels.items():
+            if "$" not in label and \
+                    not label.startswith(RETURN_LABEL_PREFIXES):
+                functions.setdefault(address, label)
+    return_addresses = {address for label, address in labels.items()
+                        if label.startswith(RETURN_LABEL_PREFIXES)}
+    return functions, return_addresses, tracks_calls
+
+
+class Profiler(BlockEmulator):
+    """
+    Runs a program like BlockEmulator while counting how many times every
+    block was entered, which gives exact per-address execution counts since
+    a block always runs to its end. With the labels of the program, cycles
+    are folded to functions, and for VM code the call stack is followed
+    through function entries and return labels, for flame graphs.
+    """
+
+    def __init__(self, rom: typing.Iterable[int],
+                 labels: typing.Optional[typing.Dict[str, int]] = None) \
+            -> None:
+        """
+        Args:
+            rom (typing.Iterable[int]): the 16-bit ROM words.
+            labels (typing.Optional[typing.Dict[str, int]]): the ROM address
+                of every label of the program, if known.
+        """
+        super().__init__(rom)
+        self.entries = [0] * ROM_SIZE
+        self.functions, return_addresses, self.tracks_calls = \
+            classify_labels(labels or {})
+        # Entering a block at one of these addresses calls the function it
+        # names, or returns from the current one for None.
+        self.events = {}
+        if self.tracks_calls:
+            self.events = dict.fromkeys(return_addresses)
+            self.events.update(self.functions)
+        self.stack = [ROOT]
+        self.stack_cycles = {}
+
+    def clone(self) -> "Profiler":
+        """
+        Returns:
+            Profiler: a copy of the profiler with the same labels and
+            counts so far, which counts on independently of it.
+        """
+        clone = super().clone()
+        clone.entries = list(self.entries)
+        clone.stack = list(self.stack)
+        clone.stack_cycles = dict(self.stack_cycles)
+        return clone
+
+    def run(self, max_steps: int) -> int:
+        """Executes blocks like BlockEmulator.run, and counts them.
+
+        Args:
+            max_steps (int): the number of instructions to execute.
+
+        Returns:
+            int: the number of instructions executed.
+        """
+        blocks = self.blocks
+        entries = self.entries
+        events = self.events
+        stack = self.stack
+        stack_cycles = self.stack_cycles
+        stack_key = ";".join(stack)
+        ram = self.ram
+        a = self.a
+        d = self.d
+        pc = self.pc
+        steps = 0
+        while steps < max_steps:
+            if pc in events:
+                function = events[pc]
+                if function is not None:
+                    stack.append(function)
+                elif len(stack) > 1:
+                    stack.pop()
+                stack_key = ";".join(stack)
+            block = blocks[pc]
+            if block is None:
+                block = self.compile_block(pc)
+            entries[pc] += 1
+            a, d, pc, count = block(a, d, ram)
+            steps += count
+            stack_cycles[stack_key] = stack_cycles.get(stack_key, 0) + count
+            if pc < 0:
+                pc = ~pc
+                self.halted = True
+                break
+        self.a = a
+        self.d = d
+        self.pc = pc
+        self.cycles += steps
+        return steps
+
+    def address_counts(self) -> typing.List[int]:
+        """
+        Returns:
+            typing.List[int]: how many times every ROM address was executed.
+        """
+        counts = [0] * ROM_SIZE
+        for start, entered in enumerate(self.entries):
+            if entered:
+                for address in range(start, start + self.blocks[start].size):
+                    counts[address & 0x7FFF] += entered
+        return counts
+
+    def function_cycles(self) -> typing.Dict[str, int]:
+        """
+        Returns:
+            typing.Dict[str, int]: the cycles spent in the code of every
+            function, not counting the functions it called.
+        """
+        cycles = {}
+        function = ROOT
+        for address, count in enumerate(self.address_counts()):
+            function = self.functions.get(address, function)
+            if count:
+                cycles[function] = cycles.get(function, 0) + count
+        return cycles
+
+    def inclusive_cycles(self) -> typing.Dict[str, int]:
+        """
+        Returns:
+            typing.Dict[str, int]: the cycles spent in every function,
+            including the functions it called. Empty if calls are not
+            tracked.
+        """
+        cycles = {}
+        if not self.tracks_calls:
+            return cycles
+        for stack_key, count in self.stack_cycles.items():
+            for function in set(stack_key.split(";")):
+                cycles[function] = cycles.get(function, 0) + count
+        return cycles
+
+    def report(self, top: int = 20) -> typing.List[str]:
+        """
+        Args:
+            top (int): the number of functions to list.
+
+        Returns:
+            typing.List[str]: the functions that took the most cycles, with
+            their self and inclusive cycles.
+        """
+        total = self.cycles or 1
+        inclusive = self.inclusive_cycles()
+        lines = ["%12s %7s %12s  %s" % ("self", "%", "inclusive", "function")]
+        for function, count in sorted(self.function_cycles().items(),
+                                      key=lambda item: -item[1])[:top]:
+            lines.append("%12d %6.2f%% %12s  %s" % (
+                count, 100.0 * count / total, inclusive.get(function, "-"),
+                function))
+        return lines
+
+    def folded_stacks(self) -> typing.List[str]:
+        """
+        Returns:
+            typing.List[str]: "caller;callee cycles" lines, as flamegraph.pl
+            reads them. Without call tracking, every function is a stack of
+            its own.
+        """
+        cycles = self.stack_cycles if self.tracks_calls \
+            else self.function_cycles()
+        return ["%s %d" % (stack_key, count)
+                for stack_key, count in sorted(cycles.items()) if count]
+
+
+if "__main__" == __name__:
+    # Runs a program and prints where its cycles went.
+    argument_parser = argparse.ArgumentParser(prog="Profiler")
+    argument_parser.add_argument("input_path")
+    argument_parser.add_argument(
+        "--steps", type=int, default=10 ** 7,
+        help="number of instructions to execute")
+    argument_parser.add_argument(
+        "--top", type=int, default=20, help="number of functions to list")
+    argument_parser.add_argument(
+        "--folded", metavar="PATH",
+        help="write folded stacks for flame graphs to PATH")
+    arguments = argument_parser.parse_args()
+    argument_path = os.path.abspath(arguments.input_path)
+    program_labels = None
+    if os.path.splitext(argument_path)[1].lower() == ".asm":
+        with open(argument_path, 'r') as input_file:
+            program_labels = scan_labels(stream_commands(input_file))
+    profiler = Profiler(load_program(argument_path), program_labels)
+    profiler.run(arguments.steps)
+    print("\n".join(profiler.report(arguments.top)))
+    if arguments.folded:
+        with open(arguments.folded, 'w') as output_file:
+            output_file.write("\n".join(profiler.folded_stacks()) + "\n")
@@ -0,0 +1,137 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import argparse
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import typing
+from array import array
+from CPUEmulator import CPUEmulator, RAM_SIZE, load_program
+
+# A snapshot is a header padded to RAM_OFFSET bytes, followed by the RAM,
+# each word stored as a little-endian signed 16-bit integer.
+SNAPSHOT_EXTENSION = ".hsnap"
+MAGIC = b"HSNP"
+VERSION = 1
+# magic, version, A, D, PC, halted, cycles, sha256 of the ROM
+HEADER = struct.Struct("<4sHhhHHQ32s")
+RAM_OFFSET = 64
+
+
+def rom_digest(emulator: CPUEmulator) -> bytes:
+    """
+    Args:
+        emulator (CPUEmulator): an emulator.
+
+    Returns:
+        bytes: the sha256 of its ROM, which a snapshot must be restored with.
+    """
+    return hashlib.sha256(emulator.rom.tobytes()).digest()
+
+
+def write_snapshot(emulator: CPUEmulator, output_file: typing.BinaryIO) \
+        -> None:
+    """Writes the registers, the PC and the RAM of an emulator.
+
+    Args:
+        emulator (CPUEmulator): the emulator to checkpoint.
+        output_file (typing.BinaryIO): writes the snapshot to this file.
+    """
+    header = HEADER.pack(MAGIC, VERSION, emulator.a, emulator.d, emulator.pc,
+                         emulator.halted, emulator.cycles,
+                         rom_digest(emulator))
+    output_file.write(header.ljust(RAM_OFFSET, b"\0"))
+    ram = emulator.ram
+    if sys.byteorder != "little":
+        ram = array('h', ram)
+        ram.byteswap()
+    output_file.write(ram)
+
+
+def restore_snapshot(emulator: CPUEmulator, path: str) -> None:
+    """Restores a snapshot into an emulator running the same ROM. The RAM is
+    not read: it becomes a private copy-on-write mapping of the file, so the
+    emulator's writes never reach the file, and only the pages it touches
+    are loaded.
+
+    Args:
+        emulator (CPUEmulator): the emulator to restore.
+        path (str): path of the snapshot.
+    """
+    with open(path, 'rb') as snapshot_file:
+        _map_snapshot(emulator, snapshot_file, path)
+
+
+def _map_snapshot(emulator: CPUEmulator, snapshot_file: typing.BinaryIO,
+                  name: str) -> None:
+    """
+    Args:
+        emulator (CPUEmulator): the emulator to restore.
+        snapshot_file (typing.BinaryIO): an open snapshot.
+        name (str): the name of the snapshot, for errors.
+    """
+    image = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_COPY)
+    if len(image) != RAM_OFFSET + 2 * RAM_SIZE:
+        raise Exception(name + " is not a Hack snapshot")
+    magic, version, a, d, pc, halted, cycles, digest = \
+        HEADER.unpack_from(image)
+    if magic != MAGIC or version != VERSION:
+        raise Exception(name + " is not a Hack snapshot")
+    if digest != rom_digest(emulator):
+        raise Exception(name + " was taken with a different ROM")
+    data = memoryview(image)[RAM_OFFSET:]
+    if sys.byteorder == "little":
+        emulator.ram = data.cast('h')
+    else:
+        emulator.ram = array('h', data.tobytes())
+        emulator.ram.byteswap()
+    emulator.a = a
+    emulator.d = d
+    emulator.pc = pc
+    emulator.halted = bool(halted)
+    emulator.cycles = cycles
+
+
+def fork(emulator: CPUEmulator) -> CPUEmulator:
+    """Copies a running emulator for a what-if run. The copy has its own
+    RAM, so running either one does not affect the other.
+
+    Args:
+        emulator (CPUEmulator): the emulator to copy.
+
+    Returns:
+        CPUEmulator: a clone of the emulator, in the same state.
+    """
+    return emulator.clone()
+
+
+if "__main__" == __name__:
+    # Runs a program, optionally from a snapshot, and optionally saves a
+    # snapshot of where it stopped.
+    argument_parser = argparse.ArgumentParser(prog="Snapshot")
+    argument_parser.add_argument("input_path")
+    argument_parser.add_argument(
+        "--steps", type=int, default=10 ** 7,
+        help="maximal number of instructions to execute")
+    argument_parser.add_argument(
+        "--restore", metavar="PATH", help="start from this snapshot")
+    argument_parser.add_argument(
+        "--save", metavar="PATH", help="save a snapshot after running")
+    arguments = argument_parser.parse_args()
+    program = CPUEmulator(load_program(os.path.abspath(arguments.input_path)))
+    if arguments.restore:
+        restore_snapshot(program, arguments.restore)
+    steps = program.run(arguments.steps)
+    print("%d instructions executed%s, %d in total" % (
+        steps, ", halted" if program.halted else "", program.cycles))
+    print("A=%d D=%d PC=%d" % (program.a, program.d, program.pc))
+    if arguments.save:
+        with open(arguments.save, 'wb') as snapshot_output:
+            write_snapshot(program, snapshot_output)
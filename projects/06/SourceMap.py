@@ -0,0 +1,109 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import json
+import typing
+from array import array
+
+SOURCE_MAP_EXTENSION = ".hackmap"
+SOURCE_MAP_FORMAT = "hack-source-map"
+SOURCE_MAP_VERSION = 1
+
+
+class SourceMap:
+    """
+    Maps every ROM address of an assembled program back to its source: the
+    line in the .asm file, the label it is under, and the last full-line
+    comment before it, which for VMtranslator output is the VM command the
+    instruction was translated from. Labels and comments repeat a lot, so
+    they are stored once in a string table and referred to by index.
+    """
+
+    def __init__(self, source_name: str = "") -> None:
+        """Creates an empty source map.
+
+        Args:
+            source_name (str): the name of the .asm file.
+        """
+        self.source_name = source_name
+        self.lines = array('I')
+        self.labels = array('I')
+        self.comments = array('I')
+        self.strings = [""]
+        self.string_indices = {"": 0}
+
+    def _intern(self, string: str) -> int:
+        index = self.string_indices.get(string)
+        if index is None:
+            index = len(self.strings)
+            self.strings.append(string)
+            self.string_indices[string] = index
+        return index
+
+    def add(self, line: int, label: str, comment: str) -> None:
+        """Maps the next ROM address.
+
+        Args:
+            line (int): the 1-based source line of the instruction.
+            label (str): the enclosing label, or "".
+            comment (str): the last comment before the instruction, or "".
+        """
+        self.lines.append(line)
+        self.labels.append(self._intern(label))
+        self.comments.append(self._intern(comment))
+
+    def lookup(self, address: int) -> typing.Tuple[int, str, str]:
+        """
+        Args:
+            address (int): a ROM address.
+
+        Returns:
+            typing.Tuple[int, str, str]: the source line, the enclosing label
+            and the comment of the instruction at the address.
+        """
+        return (self.lines[address], self.strings[self.labels[address]],
+                self.strings[self.comments[address]])
+
+    def __len__(self) -> int:
+        return len(self.lines)
+
+    def write(self, output_file: typing.TextIO) -> None:
+        """Writes the source map as JSON.
+
+        Args:
+            output_file (typing.TextIO): writes the map to this file.
+        """
+        json.dump({"format": SOURCE_MAP_FORMAT, "version": SOURCE_MAP_VERSION,
+                   "source": self.source_name, "strings": self.strings,
+                   "lines": self.lines.tolist(),
+                   "labels": self.labels.tolist(),
+                   "comments": self.comments.tolist()},
+                  output_file, separators=(",", ":"))
+
+    @staticmethod
+    def read(input_file: typing.TextIO) -> "SourceMap":
+        """Reads a source map written by write().
+
+        Args:
+            input_file (typing.TextIO): the source map file.
+
+        Returns:
+            SourceMap: the source map.
+        """
+        content = json.load(input_file)
+        if content.get("format") != SOURCE_MAP_FORMAT or \
+                content.get("version") != SOURCE_MAP_VERSION:
+            raise Exception(getattr(input_file, "name", "input") +
+                            " is not a Hack source map")
+        source_map = SourceMap(content["source"])
+        source_map.strings = content["strings"]
+        source_map.string_indices = {
+            string: index for index, string in enumerate(source_map.strings)}
+        source_map.lines = array('I', content["lines"])
+        source_map.labels = array('I', content["labels"])
+        source_map.comments = array('I', content["comments"])
+        return source_map
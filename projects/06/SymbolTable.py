@@ -6,6 +6,9 @@ as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
 Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
 """
 
+# The RAM address of the first variable, right after R0..R15.
+VARIABLES_BASE_ADDRESS = 16
+
 
 class SymbolTable:
     """
@@ -0,0 +1,327 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import argparse
+import concurrent.futures
+import os
+import sys
+import typing
+from CPUEmulator import CPUEmulator, load_program, wrap
+
+# The test script format is shared with the hardware simulator's runner.
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), "05"))
+from TestScript import SCRIPT_EXTENSION, WHILE_LIMIT, format_header, \
+    format_value, parse_column, parse_condition, parse_script, parse_value
+
+PROGRAM_EXTENSIONS = (".asm", ".hack", ".hackb")
+COMPUTER_CHIP = "Computer.hdl"
+
+# Registers by their names in CPU emulator scripts and in Computer.hdl
+# scripts.
+REGISTERS = {"A": "a", "ARegister": "a", "D": "d", "DRegister": "d",
+             "PC": "pc"}
+
+
+class TestRunner:
+    """
+    Runs a .tst script that tests a CPU program, or the Hack computer
+    (Computer.hdl) running a program, on a CPUEmulator. Every output line is
+    compared to the .cmp file as soon as it is produced.
+    """
+
+    def __init__(self, script_path: str, write_output: bool = True) -> None:
+        """
+        Args:
+            script_path (str): path of the .tst script.
+            write_output (bool): write the output file the script names.
+        """
+        self.script_path = script_path
+        self.directory = os.path.dirname(os.path.abspath(script_path))
+        self.write_output = write_output
+        self.emulator = CPUEmulator([])
+        self.computer = False
+        self.reset = 0
+        self.time = 0
+        self.half_cycle = False
+        self.columns = []
+        self.output_file = None
+        self.compare_file = None
+        self.line_number = 0
+
+    def run(self) -> int:
+        """Runs the script. A mismatch with the .cmp file raises.
+
+        Returns:
+            int: the number of lines compared.
+        """
+        with open(self.script_path, 'r') as script_file:
+            commands = parse_script(script_file.read())
+        try:
+            self.execute(commands)
+        finally:
+            for file in (self.output_file, self.compare_file):
+                if file is not None:
+                    file.close()
+        return self.line_number
+
+    def execute(self, commands: typing.List[typing.Any]) -> None:
+        """
+        Args:
+            commands (typing.List[typing.Any]): parsed commands.
+        """
+        for command in commands:
+            if command[0] == "repeat" and command[1] is None:
+                raise Exception("unsupported block: endless repeat")
+            if command[0] == "repeat":
+                _, count, body = command
+                if body == [["ticktock"]] and not self.computer:
+                    self.emulator.advance(count)
+                    self.time += count
+                    continue
+                for _ in range(count):
+                    self.execute(body)
+            elif command[0] == "while":
+                iterations = 0
+                while self.holds(command[1]):
+                    iterations += 1
+                    if iterations > WHILE_LIMIT:
+                        raise Exception(
+                            "while %s still holds after %d iterations; it "
+                            "may wait for a key press" % (command[1],
+                                                          WHILE_LIMIT))
+                    self.execute(command[2])
+            elif command[0] == "load":
+                self.load(command[1])
+            elif command[0] == "ROM32K" and command[1] == "load":
+                ram = self.emulator.ram
+                self.emulator = CPUEmulator(load_program(
+                    os.path.join(self.directory, command[2])))
+                self.emulator.ram = ram
+            elif command[0] == "output-file":
+                if self.write_output:
+                    self.output_file = open(
+                        os.path.join(self.directory, command[1]), 'w')
+            elif command[0] == "compare-to":
+                self.compare_file = open(
+                    os.path.join(self.directory, command[1]), 'r')
+            elif command[0] == "output-list":
+                self.columns = [parse_column(spec) for spec in command[1:]]
+                self.emit(format_header(self.columns))
+            elif command[0] == "set":
+                self.set(command[1], wrap(parse_value(command[2])))
+            elif command[0] == "ticktock":
+                self.tick()
+                self.tock()
+            elif command[0] == "tick":
+                self.tick()
+            elif command[0] == "tock":
+                self.tock()
+            elif command[0] == "output":
+                self.emit("|" + "|".join(
+                    " " * left + format_value(self.get(name), output_format,
+                                              width) + " " * right
+                    for name, output_format, left, width, right
+                    in self.columns) + "|")
+            elif command[0] not in ("echo", "clear-echo"):
+                raise Exception("unsupported command: %s" % " ".join(command))
+
+    def holds(self, condition: str) -> bool:
+        """
+        Args:
+            condition (str): the condition of a while block, like
+                RAM[0] <> 0 or PC < 20.
+
+        Returns:
+            bool: True if the condition holds now.
+        """
+        name, compare, value = parse_condition(condition)
+        return compare(self.get(name), wrap(value))
+
+    def load(self, name: str) -> None:
+        """
+        Args:
+            name (str): the program or chip the script loads.
+        """
+        if name.endswith(".hdl"):
+            if name != COMPUTER_CHIP:
+                raise Exception("%s is not a CPU program or %s"
+                                % (name, COMPUTER_CHIP))
+            self.computer = True
+            return
+        self.emulator = CPUEmulator(load_program(
+            os.path.join(self.directory, name)))
+
+    def tick(self) -> None:
+        """The first half of a clock cycle."""
+        self.half_cycle = True
+
+    def tock(self) -> None:
+        """The second half of a clock cycle, which executes an instruction."""
+        self.emulator.advance(1)
+        if self.reset:
+            self.emulator.reset()
+        self.half_cycle = False
+        self.time += 1
+
+    def get(self, name: str) -> typing.Any:
+        """
+        Args:
+            name (str): a variable of the script.
+
+        Returns:
+            typing.Any: its value.
+        """
+        if name == "time":
+            return "%d%s" % (self.time, "+" if self.half_cycle else "")
+        if name == "reset":
+            return self.reset
+        register = REGISTERS.get(name.partition("[")[0])
+        if register is not None:
+            return getattr(self.emulator, register)
+        return self.emulator.peek(self._address(name))
+
+    def set(self, name: str, value: int) -> None:
+        """
+        Args:
+            name (str): a variable of the script.
+            value (int): its new value.
+        """
+        if name == "reset":
+            self.reset = value
+        elif name.partition("[")[0] in REGISTERS:
+            register = REGISTERS[name.partition("[")[0]]
+            setattr(self.emulator, register,
+                    value & 0x7FFF if register == "pc" else value)
+        else:
+            self.emulator.poke(self._address(name), value)
+
+    @staticmethod
+    def _address(name: str) -> int:
+        """
+        Args:
+            name (str): a memory variable, like RAM[5] or RAM16K[5].
+
+        Returns:
+            int: its address.
+        """
+        if not (name.startswith("RAM[") or name.startswith("RAM16K[")) or \
+                not name.endswith("]"):
+            raise Exception("unknown variable: %s" % name)
+        return int(name[name.index("[") + 1:-1])
+
+    def emit(self, line: str) -> None:
+        """Writes an output line, and compares it to the next .cmp line.
+
+        Args:
+            line (str): the output line.
+        """
+        if self.output_file is not None:
+            self.output_file.write(line + "\n")
+        if self.compare_file is None:
+            return
+        self.line_number += 1
+        expected = self.compare_file.readline().rstrip()
+        if expected != line.rstrip():
+            raise Exception("comparison failure at line %d: expected %r, "
+                            "got %r" % (self.line_number, expected, line))
+
+
+def is_cpu_script(script_path: str) -> bool:
+    """
+    Args:
+        script_path (str): path of a .tst script.
+
+    Returns:
+        bool: True if the script loads a CPU program or the Hack computer,
+        rather than another chip or VM code.
+    """
+    with open(script_path, 'r') as script_file:
+        for command in parse_script(script_file.read()):
+            if command[0] == "load" and len(command) > 1:
+                return command[1] == COMPUTER_CHIP or \
+                    os.path.splitext(command[1])[1] in PROGRAM_EXTENSIONS
+    return False
+
+
+def _run_script_job(arguments: typing.Dict[str, typing.Any]) \
+        -> typing.Tuple[int, typing.Optional[str]]:
+    """Runs a script in a worker process. Errors are returned instead of
+    raised, so the parent reports them with the rest of the results.
+
+    Args:
+        arguments (typing.Dict[str, typing.Any]): keyword arguments of
+            TestRunner.
+
+    Returns:
+        typing.Tuple[int, typing.Optional[str]]: the number of lines compared
+        and None, or 0 and an error message.
+    """
+    try:
+        return TestRunner(**arguments).run(), None
+    except Exception as error:
+        return 0, "%s: %s: %s" % (arguments["script_path"],
+                                  type(error).__name__, error)
+
+
+if "__main__" == __name__:
+    # Runs a .tst script, or every CPU script under a directory.
+    argument_parser = argparse.ArgumentParser(prog="TestRunner")
+    argument_parser.add_argument("input_path")
+    argument_parser.add_argument(
+        "--jobs", type=int, default=1, metavar="N",
+        help="run scripts in N processes (0 for one per CPU)")
+    argument_parser.add_argument(
+        "--no-output", dest="write_output", action="store_false",
+        help="do not write the output files the scripts name")
+    arguments = argument_parser.parse_args()
+    if arguments.jobs < 0:
+        argument_parser.error("--jobs must be 0 or more")
+    argument_path = os.path.abspath(arguments.input_path)
+    if os.path.isdir(argument_path):
+        scripts = sorted(
+            os.path.join(root, filename)
+            for root, _, filenames in os.walk(argument_path)
+            for filename in filenames
+            if filename.endswith(SCRIPT_EXTENSION))
+        scripts = [script for script in scripts if is_cpu_script(script)]
+    else:
+        scripts = [argument_path]
+    jobs = [dict(script_path=script, write_output=arguments.write_output)
+            for script in scripts]
+    failed = 0
+
+    def report(job: typing.Dict[str, typing.Any], lines: int,
+               error: typing.Optional[str]) -> None:
+        global failed
+        if error is not None:
+            print("FAIL %s" % error, file=sys.stderr, flush=True)
+            failed += 1
+        else:
+            print("PASS %s (%d lines)" % (job["script_path"], lines),
+                  flush=True)
+
+    # Results are printed as soon as they arrive, and a worker that dies
+    # (out of memory, say) only fails the scripts it took down with it.
+    if arguments.jobs == 1:
+        for job in jobs:
+            report(job, *_run_script_job(job))
+    else:
+        with concurrent.futures.ProcessPoolExecutor(
+                max_workers=arguments.jobs or None) as executor:
+            futures = {executor.submit(_run_script_job, job): job
+                       for job in jobs}
+            for future in concurrent.futures.as_completed(futures):
+                job = futures[future]
+                try:
+                    report(job, *future.result())
+                except concurrent.futures.process.BrokenProcessPool as error:
+                    report(job, 0, "%s: worker process died: %s" % (
+                        job["script_path"], error))
+    print("%d passed, %d failed" % (len(jobs) - failed, failed))
+    if failed:
+        sys.exit(1)
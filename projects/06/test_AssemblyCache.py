@@ -0,0 +1,80 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from AssemblyCache import AssemblyCache
+
+MAIN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Main.py")
+
+
+class AssemblyCacheTest(unittest.TestCase):
+
+    def assemble(self, *options: str) -> str:
+        """
+        Args:
+            *options (str): command line options of the assembler.
+
+        Returns:
+            str: the contents of the .hack file it wrote.
+        """
+        subprocess.run([sys.executable, MAIN, self.source_path] +
+                       list(options), check=True, capture_output=True)
+        with open(os.path.join(self.directory.name, "P.hack"), 'r') as output:
+            return output.read()
+
+    def write_source(self, source: str) -> None:
+        with open(self.source_path, 'w') as source_file:
+            source_file.write(source)
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.source_path = os.path.join(self.directory.name, "P.asm")
+        self.cache_path = os.path.join(self.directory.name, "cache")
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_plain_run_does_not_change_cached_output(self) -> None:
+        self.write_source("@1\nD=A\n")
+        first = self.assemble("--cache-dir", self.cache_path)
+        self.assertEqual(first, self.assemble("--cache-dir", self.cache_path))
+        self.write_source("@2\nD=A\n")
+        self.assemble()
+        self.write_source("@1\nD=A\n")
+        self.assertEqual(first, self.assemble("--cache-dir", self.cache_path))
+        self.assertEqual("0000000000000001\n1110110000010000\n", first)
+
+    def test_temporary_files_are_not_entries(self) -> None:
+        os.makedirs(self.cache_path)
+        with open(os.path.join(self.cache_path, "entry.hack.7.tmp"),
+                  'w') as temporary_file:
+            temporary_file.write("0" * 100)
+        cache = AssemblyCache(self.cache_path)
+        self.assertEqual({}, cache.entries)
+        self.assertEqual(0, cache.total_bytes)
+
+    def test_removed_entry_is_a_miss(self) -> None:
+        self.write_source("@1\nD=A\n")
+        self.assemble("--cache-dir", self.cache_path)
+        cache = AssemblyCache(self.cache_path)
+        key = cache.key(self.source_path, ".hack")
+        self.assertIn(key, cache.entries)
+        os.remove(os.path.join(self.cache_path, key))
+        output_path = os.path.join(self.directory.name, "Q.hack")
+        self.assertFalse(cache.fetch(key, output_path))
+        self.assertNotIn(key, cache.entries)
+        self.assertEqual((0, 1), (cache.hits, cache.misses))
+        self.assertEqual("0000000000000001\n1110110000010000\n",
+                         self.assemble("--cache-dir", self.cache_path))
+
+
+if "__main__" == __name__:
+    unittest.main()
@@ -0,0 +1,56 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import os
+import unittest
+from BlockCompiler import BlockEmulator
+from CPUEmulator import CPUEmulator, load_program
+from Profiler import Profiler
+
+DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+
+
+def state(emulator: CPUEmulator) -> tuple:
+    return (emulator.a, emulator.d, emulator.pc, emulator.cycles,
+            bytes(emulator.ram))
+
+
+class AdvanceTest(unittest.TestCase):
+
+    def check(self, program: str, counts: list) -> None:
+        """Advances the interpreter and both block emulators by the same
+        counts, and compares their states after every advance.
+
+        Args:
+            program (str): an .asm file, relative to this directory.
+            counts (list): the counts to advance by.
+        """
+        rom = load_program(os.path.join(DIRECTORY, program))
+        for emulator_class in (BlockEmulator, Profiler):
+            reference, emulator = CPUEmulator(rom), emulator_class(rom)
+            for machine in (reference, emulator):
+                machine.ram[0] = 3
+                machine.ram[1] = 17
+            for count in counts:
+                reference.advance(count)
+                emulator.advance(count)
+                self.assertEqual(state(reference), state(emulator),
+                                 "%s after advance(%d)" % (
+                                     emulator_class.__name__, count))
+
+    def test_single_steps(self) -> None:
+        self.check("max/Max.asm", [1] * 30)
+
+    def test_uneven_counts(self) -> None:
+        self.check("pong/Pong.asm", [3, 7, 1, 250, 5, 1000, 37])
+
+    def test_past_halt(self) -> None:
+        self.check("max/Max.asm", [5, 100, 1, 2, 3])
+
+
+if "__main__" == __name__:
+    unittest.main()